@@ -3,12 +3,19 @@ AraBERT-v3 Integration for Enhanced Arabic Search
 Phase 10 - Next Sprint Hooks
 """
 
-import torch
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import hashlib
+import os
+import threading
 import numpy as np
 from pathlib import Path
 
+# Corpora at least this large get an IVF index instead of a flat scan
+IVF_MIN_VECTORS = 10000
+
 class AraBERTIntegration:
     """
     AraBERT-v3 integration for enhanced Arabic semantic search
@@ -23,11 +30,16 @@ class AraBERTIntegration:
         """
         self.model_name = model_name
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Resolved in load_model so importing this module stays free of torch
+        self.device = None
         
     def load_model(self):
         """Load AraBERT model"""
         try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
             self.model = SentenceTransformer(self.model_name, device=self.device)
             print(f"AraBERT model loaded: {self.model_name}")
             return True
@@ -35,12 +47,13 @@ class AraBERTIntegration:
             print(f"Failed to load AraBERT model: {e}")
             return False
     
-    def encode_texts(self, texts: List[str]) -> np.ndarray:
+    def encode_texts(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
         """
         Encode texts using AraBERT
         
         Args:
             texts: List of Arabic texts to encode
+            batch_size: Texts per forward pass
             
         Returns:
             numpy array of embeddings
@@ -51,8 +64,12 @@ class AraBERTIntegration:
         # Preprocess texts for AraBERT
         processed_texts = [self._preprocess_text(text) for text in texts]
         
-        # Encode texts
-        embeddings = self.model.encode(processed_texts, convert_to_numpy=True)
+        # Encode texts (SentenceTransformer sorts by length internally, so each
+        # batch holds similarly sized texts and padding stays small).
+        # Embeddings come back L2-normalized for inner-product search
+        embeddings = self.model.encode(processed_texts, batch_size=batch_size,
+                                       show_progress_bar=False, convert_to_numpy=True,
+                                       normalize_embeddings=True)
         return embeddings
     
     def _preprocess_text(self, text: str) -> str:
@@ -73,28 +90,51 @@ class AraBERTIntegration:
         # This is a basic implementation - can be enhanced
         return text
     
-    def create_arabert_index(self, texts: List[str], output_path: str):
+    def create_arabert_index(self, texts: List[str], output_path: str, nprobe: int = 16,
+                             quantize: bool = True):
         """
         Create FAISS index using AraBERT embeddings
         
         Args:
             texts: List of texts to index
             output_path: Path to save the index
+            nprobe: Inverted lists visited per query when an IVF index is built
+            quantize: Store vectors as 8-bit scalar codes (4x smaller, less bandwidth
+                per scan) instead of float32
         """
         import faiss
         
-        # Encode all texts
-        embeddings = self.encode_texts(texts)
+        # Use every core for training, adding and searching
+        faiss.omp_set_num_threads(os.cpu_count() or 1)
         
-        # Normalize embeddings
-        faiss.normalize_L2(embeddings)
+        # Encode all texts (already L2-normalized by encode_texts)
+        embeddings = self.encode_texts(texts)
         
         # Create FAISS index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)  # Inner product for normalized vectors
+        embeddings = embeddings.astype('float32')
+        n_vectors, dimension = embeddings.shape
+        if n_vectors >= IVF_MIN_VECTORS:
+            # Partition into ~sqrt(N) inverted lists so queries scan only nprobe of them
+            nlist = int(np.sqrt(n_vectors))
+            quantizer = faiss.IndexFlatIP(dimension)
+            if quantize:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist,
+                                                      faiss.ScalarQuantizer.QT_8bit,
+                                                      faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = nprobe
+        elif quantize:
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit,
+                                               faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dimension)  # Inner product for normalized vectors
+        
+        # Flat indexes ignore training; IVF lists and SQ8 ranges are learned here
+        index.train(embeddings)
         
         # Add embeddings to index
-        index.add(embeddings.astype('float32'))
+        index.add(embeddings)
         
         # Save index
         faiss.write_index(index, output_path)
@@ -107,14 +147,91 @@ class HybridSearchWithAraBERT:
     Enhanced hybrid search combining mE5 and AraBERT
     """
     
-    def __init__(self, me5_model, arabert_model, bm25_index, faiss_me5, faiss_arabert, meta):
+    def __init__(self, me5_model, arabert_model, bm25_index, faiss_me5, faiss_arabert, meta,
+                 query_cache_size: int = 4096):
+        import faiss
+        
         self.me5_model = me5_model
         self.arabert_model = arabert_model
+        # Both mE5 and AraBERT indices hold L2-normalized vectors
+        self._encode_me5 = partial(me5_model.encode, normalize_embeddings=True)
         self.bm25_index = bm25_index
         self.faiss_me5 = faiss_me5
         self.faiss_arabert = faiss_arabert
         self.meta = meta
         
+        # Search on the GPU when one is available, otherwise on every CPU core
+        self._gpu_resources = None
+        if faiss.get_num_gpus() > 0:
+            # Kept on self so the GPU memory is not released while the indices live
+            self._gpu_resources = faiss.StandardGpuResources()
+            self.faiss_me5 = self._to_gpu(faiss, faiss_me5)
+            self.faiss_arabert = self._to_gpu(faiss, faiss_arabert)
+        else:
+            faiss.omp_set_num_threads(os.cpu_count() or 1)
+        
+        # Shared pool so both query encoders run side by side
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        # LRU of query embeddings keyed by (model_id, query digest)
+        self.query_cache_size = query_cache_size
+        self._qcache = OrderedDict()
+        self._qcache_lock = threading.Lock()
+    
+    def _to_gpu(self, faiss, index):
+        """
+        Copy an index to GPU 0, keeping the CPU index for types the GPU lacks
+        
+        Args:
+            faiss: The faiss module
+            index: CPU FAISS index
+            
+        Returns:
+            GPU index, or the original index if it cannot be transferred
+        """
+        try:
+            return faiss.index_cpu_to_gpu(self._gpu_resources, 0, index)
+        except (RuntimeError, AttributeError) as e:
+            print(f"Keeping FAISS index on CPU: {e}")
+            return index
+    
+    def _encode_cached(self, model_id: str, encode_fn, query: str) -> np.ndarray:
+        """
+        Encode a single query, reusing a cached embedding when available
+        
+        Args:
+            model_id: Cache namespace for the encoder
+            encode_fn: Encoder taking a list of texts
+            query: Query text
+            
+        Returns:
+            numpy array of shape (1, dim)
+        """
+        key = (model_id, hashlib.blake2b(query.encode("utf-8"), digest_size=16).digest())
+        with self._qcache_lock:
+            embedding = self._qcache.get(key)
+            if embedding is not None:
+                self._qcache.move_to_end(key)
+                return embedding
+        
+        embedding = encode_fn([query])
+        
+        with self._qcache_lock:
+            self._qcache[key] = embedding
+            if len(self._qcache) > self.query_cache_size:
+                self._qcache.popitem(last=False)
+        return embedding
+    
+    def warm_query_cache(self, queries: List[str]):
+        """
+        Pre-populate the query embedding cache
+        
+        Args:
+            queries: Canonical queries to encode ahead of time
+        """
+        for query in queries:
+            self._encode_cached("me5", self._encode_me5, query)
+            self._encode_cached("arabert", self.arabert_model.encode_texts, query)
+        
     def search(self, query: str, topk: int = 10, 
                me5_weight: float = 0.4, arabert_weight: float = 0.3, bm25_weight: float = 0.3):
         """
@@ -140,45 +257,49 @@ class HybridSearchWithAraBERT:
         bm25_scores = self.bm25_index.get_scores(query.split())
         bm25_indices = np.argsort(bm25_scores)[::-1][:topk*2]
         
+        # Encode the query with mE5 and AraBERT concurrently
+        me5_future = self._executor.submit(
+            self._encode_cached, "me5", self._encode_me5, query)
+        arabert_future = self._executor.submit(
+            self._encode_cached, "arabert", self.arabert_model.encode_texts, query)
+        me5_query_embedding = me5_future.result()
+        arabert_query_embedding = arabert_future.result()
+        
         # Get mE5 results
-        me5_query_embedding = self.me5_model.encode([query])
         me5_scores, me5_indices = self.faiss_me5.search(me5_query_embedding, topk*2)
         
         # Get AraBERT results
-        arabert_query_embedding = self.arabert_model.encode_texts([query])
         arabert_scores, arabert_indices = self.faiss_arabert.search(arabert_query_embedding, topk*2)
         
-        # Combine results
-        combined_scores = {}
-        
-        # Add BM25 scores
-        for i, idx in enumerate(bm5_indices):
-            if idx < len(self.meta):
-                score = bm25_scores[idx] * bm25_weight
-                combined_scores[idx] = combined_scores.get(idx, 0) + score
-        
-        # Add mE5 scores
-        for i, idx in enumerate(me5_indices[0]):
-            if idx < len(self.meta):
-                score = me5_scores[0][i] * me5_weight
-                combined_scores[idx] = combined_scores.get(idx, 0) + score
+        # Combine results: scatter-add each weighted score list into one dense vector
+        n_docs = len(self.meta)
+        combined_scores = np.zeros(n_docs, dtype=np.float32)
+        is_candidate = np.zeros(n_docs, dtype=bool)
         
-        # Add AraBERT scores
-        for i, idx in enumerate(arabert_indices[0]):
-            if idx < len(self.meta):
-                score = arabert_scores[0][i] * arabert_weight
-                combined_scores[idx] = combined_scores.get(idx, 0) + score
+        for indices, scores, weight in (
+            (bm25_indices, np.asarray(bm25_scores)[bm25_indices], bm25_weight),
+            (me5_indices[0], me5_scores[0], me5_weight),
+            (arabert_indices[0], arabert_scores[0], arabert_weight),
+        ):
+            # FAISS pads missing neighbours with -1
+            valid = (indices >= 0) & (indices < n_docs)
+            np.add.at(combined_scores, indices[valid], (scores[valid] * weight).astype(np.float32))
+            is_candidate[indices[valid]] = True
         
-        # Sort by combined score
-        sorted_results = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+        # Select the top results among candidates without a full sort
+        candidates = np.flatnonzero(is_candidate)
+        k = min(topk, len(candidates))
+        if k == 0:
+            return []
+        top = candidates[np.argpartition(-combined_scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-combined_scores[top], kind="stable")]
         
         # Return top results
         results = []
-        for idx, score in sorted_results[:topk]:
-            if idx < len(self.meta):
-                result = self.meta[idx].copy()
-                result['score'] = float(score)
-                results.append(result)
+        for idx in top:
+            result = self.meta[idx].copy()
+            result['score'] = float(combined_scores[idx])
+            results.append(result)
         
         return results
 
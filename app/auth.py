@@ -3,8 +3,13 @@ Authentication and Role-Based Access Control (RBAC) system
 """
 import os
 import json
+import hmac
+import hashlib
+import time
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Callable, Optional, List, Dict, Any
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
@@ -19,6 +24,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Successful password checks are remembered for a few minutes so repeated logins
+# skip the bcrypt KDF. Keys are an HMAC of username, password and stored hash, so
+# no plaintext is kept and a password change invalidates old entries by itself.
+VERIFY_CACHE_TTL_SECONDS = 300
+VERIFY_CACHE_MAX_ENTRIES = 1024
+_verify_cache: Dict[bytes, float] = {}
+# Logins verify on a thread pool; authenticate_user sweeps and inserts under this lock
+_verify_cache_lock = threading.Lock()
+
+# Verified bearer tokens map to their User until the token's own expiry, so repeat
+# requests skip the JWT signature check. Keys are a digest of the exact token bytes.
+TOKEN_CACHE_MAX_ENTRIES = 4096
+_token_cache: Dict[bytes, tuple] = {}
+
 # HTTP Bearer token
 security = HTTPBearer()
 
@@ -49,12 +68,14 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 # In-memory user storage (in production, use a database)
+# Seed passwords are stored as precomputed bcrypt hashes so importing this
+# module does not pay for three bcrypt rounds (admin123 / legal123 / staff123)
 USERS_DB: Dict[str, Dict[str, Any]] = {
     "admin": {
         "username": "admin",
         "email": "admin@nrrc.gov.sa",
         "full_name": "System Administrator",
-        "hashed_password": pwd_context.hash("admin123"),
+        "hashed_password": "$2b$12$kX9CdlcNepIBOuHsoWaxN.EJMz2J2Bxjf8n4KPDKKTFa2OPK4FrVC",
         "roles": ["admin", "legal", "staff"],
         "is_active": True
     },
@@ -62,7 +83,7 @@ USERS_DB: Dict[str, Dict[str, Any]] = {
         "username": "legal",
         "email": "legal@nrrc.gov.sa", 
         "full_name": "Legal Advisor",
-        "hashed_password": pwd_context.hash("legal123"),
+        "hashed_password": "$2b$12$k9SecGC6Hq.APLtdWMpxp.J72PV4cTT9F/r6PnNgYbtr7Xzj/o3r6",
         "roles": ["legal", "staff"],
         "is_active": True
     },
@@ -70,7 +91,7 @@ USERS_DB: Dict[str, Dict[str, Any]] = {
         "username": "staff",
         "email": "staff@nrrc.gov.sa",
         "full_name": "General Staff",
-        "hashed_password": pwd_context.hash("staff123"),
+        "hashed_password": "$2b$12$VFlsKqJjI1v8V6itU8wkrutCXnjB.HodfEgr7/.IK0muwyPKzmYQW",
         "roles": ["staff"],
         "is_active": True
     }
@@ -88,13 +109,31 @@ def get_user(username: str) -> Optional[Dict[str, Any]]:
     """Get user by username"""
     return USERS_DB.get(username)
 
+def _verify_cache_key(username: str, password: str, hashed_password: str) -> bytes:
+    """Derive the verify-cache key for a set of credentials"""
+    message = "\0".join((username, password, hashed_password)).encode("utf-8")
+    return hmac.new(SECRET_KEY.encode("utf-8"), message, hashlib.sha256).digest()
+
 def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     """Authenticate a user"""
     user = get_user(username)
     if not user:
+        # Spend the same bcrypt time as a wrong password so timing doesn't reveal usernames
+        pwd_context.dummy_verify()
         return None
-    if not verify_password(password, user["hashed_password"]):
-        return None
+    key = _verify_cache_key(username, password, user["hashed_password"])
+    now = time.monotonic()
+    expires_at = _verify_cache.get(key)
+    if expires_at is None or expires_at < now:
+        if not verify_password(password, user["hashed_password"]):
+            return None
+        with _verify_cache_lock:
+            if len(_verify_cache) >= VERIFY_CACHE_MAX_ENTRIES:
+                for stale_key in [k for k, exp in _verify_cache.items() if exp < now]:
+                    del _verify_cache[stale_key]
+                if len(_verify_cache) >= VERIFY_CACHE_MAX_ENTRIES:
+                    _verify_cache.clear()
+            _verify_cache[key] = now + VERIFY_CACHE_TTL_SECONDS
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -116,8 +155,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    token = credentials.credentials
+    key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    now = time.time()
+    cached = _token_cache.get(key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -129,17 +175,27 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user is None:
         raise credentials_exception
     
-    return User(
+    current_user = User(
         username=user["username"],
         email=user["email"],
         full_name=user["full_name"],
         roles=user["roles"],
         is_active=user["is_active"]
     )
+    if "exp" not in payload:
+        return current_user
+    if len(_token_cache) >= TOKEN_CACHE_MAX_ENTRIES:
+        for stale_key in [k for k, (_, exp) in _token_cache.items() if exp <= now]:
+            del _token_cache[stale_key]
+        if len(_token_cache) >= TOKEN_CACHE_MAX_ENTRIES:
+            _token_cache.clear()
+    _token_cache[key] = (current_user, float(payload["exp"]))
+    return current_user
 
 def require_roles(required_roles: List[str]):
     """Decorator to require specific roles"""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    # async so FastAPI awaits the check inline instead of dispatching it to the threadpool
+    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
         if not current_user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -160,6 +216,9 @@ def require_roles(required_roles: List[str]):
     
     return role_checker
 
+# Roles allowed to see documents with 'restricted' in their name
+RESTRICTED_ACCESS_ROLES = frozenset({'legal', 'admin'})
+
 def check_file_access(user_roles: List[str], doc_id: str) -> bool:
     """
     Check if user has access to a document based on file restrictions.
@@ -168,23 +227,32 @@ def check_file_access(user_roles: List[str], doc_id: str) -> bool:
     # Check if document name contains 'restricted'
     if 'restricted' in doc_id.lower():
         # Only legal and admin roles can access restricted files
-        allowed_roles = {'legal', 'admin'}
-        user_roles_set = set(user_roles)
-        return bool(user_roles_set.intersection(allowed_roles))
+        return not RESTRICTED_ACCESS_ROLES.isdisjoint(user_roles)
     
     # All other files are accessible by all roles
     return True
 
+@lru_cache(maxsize=None)  # one entry per document id in the corpus
+def _is_unrestricted(doc_id: str) -> bool:
+    return 'restricted' not in doc_id.lower()
+
+def document_filter(user_roles: List[str]) -> Optional[Callable[[str], bool]]:
+    """
+    doc_id -> bool access check for retrieval.search, or None when the roles open every file
+    """
+    # Same rule as check_file_access, decided once per request instead of once per document
+    if not RESTRICTED_ACCESS_ROLES.isdisjoint(user_roles):
+        return None
+    return _is_unrestricted
+
 def filter_documents_by_access(user_roles: List[str], documents: List[Dict]) -> List[Dict]:
     """
     Filter documents based on user's role and file restrictions
     """
-    filtered_docs = []
-    for doc in documents:
-        doc_id = doc.get('doc_id', '')
-        if check_file_access(user_roles, doc_id):
-            filtered_docs.append(doc)
-    return filtered_docs
+    # Decide the role check once per request instead of once per document
+    if not RESTRICTED_ACCESS_ROLES.isdisjoint(user_roles):
+        return list(documents)
+    return [doc for doc in documents if 'restricted' not in doc.get('doc_id', '').lower()]
 
 # Role hierarchy for easier management
 ROLE_HIERARCHY = {
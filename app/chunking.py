@@ -1,48 +1,58 @@
 from __future__ import annotations
 import fitz, re, json, os
+from bisect import bisect_right
+from itertools import accumulate
+from multiprocessing import Pool
 from typing import List
 from .normalize import normalize_ar, to_western_digits, tokenize_ar
 
+# "(?:ال)?مادة" matches the same markers as "(?:المادة|مادة)" without retrying the alternation
 ARTICLE_RE = re.compile(
-    r'(?:^|\n)\s*(?:المادة|مادة)\s*([0-9\u0660-\u0669\u06F0-\u06F9]+|\S+)\s*', re.M
+    r'(?:^|\n)\s*(?:ال)?مادة\s*([0-9\u0660-\u0669\u06F0-\u06F9]+|\S+)\s*', re.M
 )
 
 def extract_text_with_pages(pdf_path: str) -> list[dict]:
-    doc = fitz.open(pdf_path)
-    return [{"page": i+1, "text": page.get_text("text")} for i, page in enumerate(doc)]
+    with fitz.open(pdf_path) as doc:
+        return [{"page": i+1, "text": page.get_text("text")} for i, page in enumerate(doc)]
 
 def split_by_articles(full_text: str) -> list[dict]:
-    """Split PDF full text by Arabic article markers."""
+    """Split PDF full text by Arabic article markers.
+
+    Each chunk also carries the [start, end) offsets of its stripped text in full_text.
+    """
     positions = []
     for m in ARTICLE_RE.finditer(full_text):
         num = to_western_digits(m.group(1))
         positions.append((m.start(), num))
     chunks = []
     if not positions:
-        return [{"article_no": None, "text": full_text}]
+        return [{"article_no": None, "text": full_text, "start": 0, "end": len(full_text)}]
     for idx, (start, num) in enumerate(positions):
         end = positions[idx+1][0] if idx+1 < len(positions) else len(full_text)
-        chunks.append({"article_no": num, "text": full_text[start:end].strip()})
+        raw = full_text[start:end]
+        text = raw.strip()
+        text_start = start + len(raw) - len(raw.lstrip())
+        chunks.append({"article_no": num, "text": text,
+                       "start": text_start, "end": text_start + len(text)})
     return chunks
 
-def find_pages_for_text(article_text: str, pages: list[dict]) -> list[int]:
-    """Find all pages that contain any portion of this article text."""
-    normalized = normalize_ar(article_text[:300])
-    hits = []
-    for p in pages:
-        if normalized[:40] in normalize_ar(p["text"]):
-            hits.append(p["page"])
-    return hits or [1]
+def pages_for_span(start: int, end: int, page_offsets: list[int], pages: list[dict]) -> list[int]:
+    """Return the page numbers covering full_text[start:end] via the page start offsets."""
+    first = max(bisect_right(page_offsets, start) - 1, 0)
+    last = max(bisect_right(page_offsets, max(end - 1, start)) - 1, first)
+    return [p["page"] for p in pages[first:last+1]] or [1]
 
 def build_chunks_from_pdf(pdf_path: str, doc_id: str, roles: list[str]) -> list[dict]:
     """Build semantic chunks with better metadata."""
     pages = extract_text_with_pages(pdf_path)
     full_text = "\n".join([p["text"] for p in pages])
+    # Offset of each page in full_text (pages are joined with a single "\n")
+    page_offsets = list(accumulate((len(p["text"]) + 1 for p in pages[:-1]), initial=0))
     article_chunks = split_by_articles(full_text)
     out = []
 
     for i, ch in enumerate(article_chunks):
-        page_hits = find_pages_for_text(ch["text"], pages)
+        page_hits = pages_for_span(ch["start"], ch["end"], page_offsets, pages)
         tokens = tokenize_ar(ch["text"])
         out.append({
             "id": f"{doc_id}::art{ch['article_no'] or i}",
@@ -52,20 +62,28 @@ def build_chunks_from_pdf(pdf_path: str, doc_id: str, roles: list[str]) -> list[
             "text": ch["text"],
             "norm_text": normalize_ar(ch["text"]),
             "roles": roles,
-            "tokens": list(set(tokens))
+            "tokens": list(dict.fromkeys(tokens))
         })
     return out
 
-def run_for_folder(raw_dir: str, out_path: str, default_roles: list[str]|None=None) -> None:
+def _build_chunks_worker(args: tuple[str, str, list[str]]) -> list[dict]:
+    pdf_path, doc_id, roles = args
+    print(f"[+] Processing {os.path.basename(pdf_path)}")
+    return build_chunks_from_pdf(pdf_path, doc_id, roles)
+
+def run_for_folder(raw_dir: str, out_path: str, default_roles: list[str]|None=None,
+                   workers: int|None=None) -> None:
     default_roles = default_roles or ["staff","legal","admin"]
-    all_chunks = []
-    for fn in sorted(os.listdir(raw_dir)):
-        if fn.lower().endswith(".pdf"):
-            doc_id = os.path.splitext(fn)[0]
-            print(f"[+] Processing {fn}")
-            all_chunks += build_chunks_from_pdf(os.path.join(raw_dir, fn), doc_id, default_roles)
+    jobs = [(os.path.join(raw_dir, fn), os.path.splitext(fn)[0], default_roles)
+            for fn in sorted(os.listdir(raw_dir)) if fn.lower().endswith(".pdf")]
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        for ch in all_chunks:
-            f.write(json.dumps(ch, ensure_ascii=False) + "\n")
-    print(f"[ok] wrote {len(all_chunks)} chunks → {out_path}")
+    n_chunks = 0
+    # PDFs are chunked in parallel processes (CPU-bound, GIL-held regex work);
+    # imap keeps the output in file order. Each PDF's chunks are streamed
+    # straight to disk instead of holding the whole corpus in memory
+    with Pool(processes=workers) as pool, open(out_path, "w", encoding="utf-8") as f:
+        for chunks in pool.imap(_build_chunks_worker, jobs, chunksize=1):
+            for ch in chunks:
+                f.write(json.dumps(ch, ensure_ascii=False) + "\n")
+            n_chunks += len(chunks)
+    print(f"[ok] wrote {n_chunks} chunks → {out_path}")
@@ -1,27 +1,34 @@
 import re
-_DIAC = re.compile(r'[\u0617-\u061A\u064B-\u0652]')
 _ARABIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
 _EXT_ARABIC_DIGITS = "۰۱۲۳۴۵۶۷۸۹"
 
+# Translation tables built once at import so each call is a single str.translate pass
+_DIAC_TABLE = {c: None for r in ((0x0617, 0x061A), (0x064B, 0x0652)) for c in range(r[0], r[1] + 1)}
+_NORM_TABLE = {
+    **_DIAC_TABLE,
+    ord('ـ'): None,  # tatweel
+    ord('أ'): 'ا', ord('إ'): 'ا', ord('آ'): 'ا',
+    ord('ى'): 'ي', ord('ؤ'): 'و', ord('ئ'): 'ي',
+    ord('،'): ',', ord('؛'): ';', ord('؟'): '?',
+    ord('“'): '"', ord('”'): '"', ord('’'): "'",
+}
+_DIGIT_TABLE = {ord(a): ord('0')+i for i,a in enumerate(_ARABIC_DIGITS)}
+_DIGIT_TABLE.update({ord(a): ord('0')+i for i,a in enumerate(_EXT_ARABIC_DIGITS)})
+# Digit folding + normalization fused for tokenization
+_TOKEN_TABLE = {**_NORM_TABLE, **_DIGIT_TABLE}
+_TOKEN_RE = re.compile(r'[\u0621-\u064A0-9]+')
+
 def strip_diacritics(s: str) -> str:
-    return re.sub(_DIAC, '', s)
+    return s.translate(_DIAC_TABLE)
 
 def normalize_ar(s: str) -> str:
     if not isinstance(s, str):
         return s
-    s = strip_diacritics(s)
-    s = s.replace('ـ', '')  # tatweel
-    s = s.replace('أ','ا').replace('إ','ا').replace('آ','ا')
-    s = s.replace('ى','ي').replace('ؤ','و').replace('ئ','ي')
-    s = s.replace('،', ',').replace('؛',';').replace('؟','?')
-    s = s.replace('“','"').replace('”','"').replace('’',"'")
-    return s
+    return s.translate(_NORM_TABLE)
 
 def to_western_digits(s: str) -> str:
-    trans = {ord(a): ord('0')+i for i,a in enumerate(_ARABIC_DIGITS)}
-    trans.update({ord(a): ord('0')+i for i,a in enumerate(_EXT_ARABIC_DIGITS)})
-    return s.translate(trans)
+    return s.translate(_DIGIT_TABLE)
 
 def tokenize_ar(s: str) -> list[str]:
-    s = normalize_ar(to_western_digits(s))
-    return re.findall(r'[\u0621-\u064A0-9]+', s)
+    s = s.translate(_TOKEN_TABLE)
+    return _TOKEN_RE.findall(s)
@@ -3,12 +3,19 @@ Multilingual Reranker for Enhanced Search Results
 Phase 10 - Next Sprint Hooks
 """
 
-import torch
 from typing import List, Dict, Any, Tuple
 import numpy as np
-from sentence_transformers import CrossEncoder
 from pathlib import Path
 
+def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first"""
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top_idx = np.argpartition(-scores, k - 1)[:k]
+    # Break ties by original position, as a stable sort would
+    return top_idx[np.lexsort((top_idx, -scores[top_idx]))]
+
 class MultilingualReranker:
     """
     Multilingual reranker for top-50 results
@@ -23,12 +30,20 @@ class MultilingualReranker:
         """
         self.model_name = model_name
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Resolved in load_model so importing this module stays free of torch
+        self.device = None
         
     def load_model(self):
         """Load reranker model"""
         try:
+            import torch
+            from sentence_transformers import CrossEncoder
+
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
             self.model = CrossEncoder(self.model_name, device=self.device)
+            if self.device == "cuda":
+                # FP16 inference halves memory traffic on the GPU
+                self.model.model.half()
             print(f"Reranker model loaded: {self.model_name}")
             return True
         except Exception as e:
@@ -62,17 +77,16 @@ class MultilingualReranker:
             pairs.append([query, text])
         
         # Get relevance scores
-        scores = self.model.predict(pairs)
+        scores = np.asarray(self.model.predict(pairs), dtype=np.float32)
         
-        # Sort documents by relevance score
-        scored_docs = list(zip(documents, scores))
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        # Select the top-k by relevance score, sorting only those
+        top_idx = _top_k_indices(scores, top_k)
         
         # Return top-k results with updated scores
         reranked_docs = []
-        for doc, score in scored_docs[:top_k]:
-            doc_copy = doc.copy()
-            doc_copy['rerank_score'] = float(score)
+        for i in top_idx:
+            doc_copy = documents[i].copy()
+            doc_copy['rerank_score'] = float(scores[i])
             reranked_docs.append(doc_copy)
         
         return reranked_docs
@@ -118,6 +132,7 @@ class AdvancedReranker:
         reranked = self.base_reranker.rerank(query, documents, len(documents))
         
         # Combine with original scores
+        combined_scores = np.empty(len(reranked), dtype=np.float32)
         for i, doc in enumerate(reranked):
             original_score = doc.get('score', 0.0)
             rerank_score = doc.get('rerank_score', 0.0)
@@ -133,11 +148,10 @@ class AdvancedReranker:
             doc['combined_score'] = combined_score
             doc['original_score'] = original_score
             doc['rerank_score'] = rerank_score
+            combined_scores[i] = combined_score
         
-        # Sort by combined score
-        reranked.sort(key=lambda x: x['combined_score'], reverse=True)
-        
-        return reranked[:top_k]
+        # Select the top-k by combined score
+        return [reranked[i] for i in _top_k_indices(combined_scores, top_k)]
     
     def rerank_by_article_relevance(self, query: str, documents: List[Dict[str, Any]], 
                                    top_k: int = 10) -> List[Dict[str, Any]]:
@@ -158,31 +172,10 @@ class AdvancedReranker:
         if not documents:
             return []
         
-        # Group documents by article
-        article_groups = {}
-        for doc in documents:
-            article_key = f"{doc.get('doc_id', '')}_{doc.get('article_no', '')}"
-            if article_key not in article_groups:
-                article_groups[article_key] = []
-            article_groups[article_key].append(doc)
-        
-        # Rerank within each article group
-        reranked_articles = []
-        for article_key, article_docs in article_groups.items():
-            if len(article_docs) == 1:
-                # Single document per article
-                reranked_articles.extend(article_docs)
-            else:
-                # Multiple documents per article - rerank them
-                reranked_article_docs = self.base_reranker.rerank(
-                    query, article_docs, len(article_docs)
-                )
-                reranked_articles.extend(reranked_article_docs)
-        
-        # Final rerank across all documents
-        final_reranked = self.base_reranker.rerank(query, reranked_articles, top_k)
-        
-        return final_reranked
+        # Reranking inside each article group and then across all documents sorts by
+        # the same cross-encoder scores twice, so one forward pass over every
+        # document yields the same final order
+        return self.base_reranker.rerank(query, documents, top_k)
 
 def create_reranker_script():
     """
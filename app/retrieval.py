@@ -1,25 +1,264 @@
 from __future__ import annotations
-import json, pickle, faiss, numpy as np, re, os
-from dataclasses import dataclass
+import pickle, faiss, numpy as np, re, os, threading
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+from functools import lru_cache
 from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
+from .bm25_fast import BM25Fast
 from .normalize import tokenize_ar, normalize_ar
 
 
+SNIPPET_CHARS = 700
+QUERY_EMBED_CACHE_SIZE = 4096  # ~3 KB per 768-d fp32 embedding
+
+# Index files written by scripts/03-04, relative to the repository root
+BM25_PATH = "data/idx/bm25.pkl"
+FAISS_PATH = "data/idx/mE5.faiss"
+META_PATH = "data/idx/meta.json"
+MODEL_NAME = "intfloat/multilingual-e5-base"
+ONNX_MODEL_DIR = "data/models/mE5"  # written by scripts/06_export_onnx.py
+
+
+@dataclass
+class IndicesMeta:
+    """Query-time chunk fields as parallel arrays indexed by chunk id (struct of arrays)."""
+    doc_ids: list[str]
+    article_nos: list
+    page_starts: list
+    page_ends: list
+    snippets: list[str]
+    role_names: list[str]
+    role_matrix: np.ndarray  # bool, (n_chunks, len(role_names))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def from_records(cls, metas: list[dict]) -> IndicesMeta:
+        role_names = sorted({r for m in metas for r in m.get("roles", [])})
+        role_col = {r: i for i, r in enumerate(role_names)}
+        role_matrix = np.zeros((len(metas), len(role_names)), dtype=bool)
+        page_starts, page_ends = [], []
+        for i, m in enumerate(metas):
+            for r in m.get("roles", []):
+                role_matrix[i, role_col[r]] = True
+            pages = m.get("pages", [])
+            page_starts.append(pages[0] if pages else m.get("page_start"))
+            page_ends.append(pages[-1] if pages else m.get("page_end"))
+        return cls(
+            doc_ids=[m["doc_id"] for m in metas],
+            article_nos=[m.get("article_no") for m in metas],
+            page_starts=page_starts,
+            page_ends=page_ends,
+            snippets=[m["text"][:SNIPPET_CHARS].replace("\n", " ") for m in metas],
+            role_names=role_names,
+            role_matrix=role_matrix,
+        )
+
+    def allowed(self, ids: np.ndarray, roles: list[str]) -> np.ndarray:
+        """Boolean mask of the chunks in ids that share at least one role with roles."""
+        role_set = set(roles)
+        cols = [i for i, r in enumerate(self.role_names) if r in role_set]
+        return self.role_matrix[np.ix_(ids, cols)].any(axis=1)
+
+
 @dataclass
 class Indices:
-    bm25: BM25Okapi
+    bm25: BM25Fast
     faiss_index: faiss.Index
-    meta: list[dict]
+    meta: IndicesMeta
     model: SentenceTransformer
+    # Normalized query text -> L2-normalized embedding, in LRU order
+    query_embeddings: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    # search_batch runs on several executor threads at once; guards query_embeddings
+    query_embeddings_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not isinstance(self.meta, IndicesMeta):
+            self.meta = IndicesMeta.from_records(self.meta)
 
 
 # --------------------------- Loaders ---------------------------
 
-def load_bm25(path): return pickle.load(open(path, "rb"))
-def load_faiss(path): return faiss.read_index(path)
-def load_meta(path): return json.load(open(path, "r", encoding="utf-8"))
-def load_model(name="intfloat/multilingual-e5-base"): return SentenceTransformer(name)
+def load_bm25(path):
+    with open(path, "rb") as f:
+        bm25 = pickle.loads(f.read())
+    # Older builds pickle a rank_bm25.BM25Okapi; score through the CSR layout either way
+    return bm25 if isinstance(bm25, BM25Fast) else BM25Fast.from_okapi(bm25)
+
+
+_gpu_resources = None  # shared StandardGpuResources, kept alive for GPU indices
+
+# Map the vectors from the page cache instead of copying them, so Uvicorn workers share
+# one physical copy; faiss < 1.9 only knows IO_FLAG_MMAP, which covers IVF lists
+_FAISS_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_faiss(path, nprobe=16, ef_search=64):
+    global _gpu_resources
+    on_gpu = faiss.get_num_gpus() > 0
+    # A GPU index is copied to device memory anyway, so only map the file on CPU
+    index = faiss.read_index(path) if on_gpu else faiss.read_index(path, _FAISS_MMAP_FLAGS)
+    # IVF indices written by scripts/07_rebuild_faiss.py probe nprobe lists per query
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    # HNSW graphs explore ef_search candidates per query
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = max(ef_search, index.hnsw.efSearch)
+    if on_gpu:
+        try:
+            if _gpu_resources is None:
+                _gpu_resources = faiss.StandardGpuResources()
+            index = faiss.index_cpu_to_gpu(_gpu_resources, 0, index)
+        except Exception as e:
+            print(f"[!] Keeping FAISS index on CPU: {e}")
+    return index
+
+
+# Bump when IndicesMeta's fields change so stale column caches are ignored
+META_CACHE_VERSION = 1
+
+
+def load_meta(path):
+    """Load meta.json as IndicesMeta, through a columnar pickle cached next to it.
+
+    The cache is rebuilt whenever meta.json is newer (e.g. after scripts/add_restricted_docs.py).
+    """
+    cache_path = f"{os.path.splitext(path)[0]}.cols.v{META_CACHE_VERSION}.pkl"
+    try:
+        if os.stat(cache_path).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            with open(cache_path, "rb") as f:
+                return pickle.loads(f.read())
+    except OSError:
+        pass
+    with open(path, "rb") as f:
+        meta = IndicesMeta.from_records(orjson.loads(f.read()))
+    # Written under a per-process name and renamed, so concurrent workers never see a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[!] Could not write {cache_path}: {e}")
+    return meta
+
+
+# ONNX weights inside a model directory, as written by scripts/06_export_onnx.py
+ONNX_FP32_FILE = "onnx/model.onnx"
+ONNX_QINT8_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+ONNX_QINT8_AVX2_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+@lru_cache(maxsize=1)
+def _cpu_flags() -> frozenset[str]:
+    """Instruction-set flags the CPU advertises in /proc/cpuinfo (empty off Linux)."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return frozenset(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return frozenset()
+
+
+def _onnx_qint8_file(model_dir) -> str | None:
+    """The int8 ONNX export in model_dir built for this CPU's widest int8 instructions, if any."""
+    flags = _cpu_flags()
+    for flag, file_name in (("avx512_vnni", ONNX_QINT8_FILE), ("avx2", ONNX_QINT8_AVX2_FILE)):
+        if flag in flags and os.path.exists(os.path.join(model_dir, file_name)):
+            return file_name
+    return None
+
+
+def _cpu_has_bf16() -> bool:
+    """True when the CPU has native bf16 matmuls (AVX-512 BF16 or AMX, Cooper Lake / Zen 4 and later)."""
+    return not _cpu_flags().isdisjoint({"avx512_bf16", "amx_bf16"})
+
+
+def load_model(name="intfloat/multilingual-e5-base", backend="onnx", num_threads=None, onnx_dir=None):
+    """Load the query encoder in the cheapest precision the hardware runs natively.
+
+    FP16 on a GPU (torch.compile-d when possible); on CPU the int8 ONNX export built for the
+    CPU (AVX-512 VNNI or AVX2), else bf16 PyTorch on bf16-capable CPUs, else the FP32 ONNX
+    graph, and FP32 PyTorch when ONNX Runtime is missing.
+    onnx_dir is the export from scripts/06_export_onnx.py, which holds only ONNX graphs, so it
+    is used for the ONNX backend alone; the PyTorch variants always load from name.
+    num_threads caps the CPU threads of one forward pass (default: all cores).
+    """
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # only settable before torch starts its first parallel region
+    if torch.cuda.is_available():
+        # Half precision runs the encoder matmuls on tensor cores; transformers already picks
+        # the fused SDPA attention kernel, so BetterTransformer would add nothing
+        model = SentenceTransformer(name, device="cuda", model_kwargs={"torch_dtype": torch.float16})
+        eager = model[0].auto_model
+        try:
+            # dynamic=True: query lengths vary, so don't recompile per padded length
+            model[0].auto_model = torch.compile(eager, dynamic=True)
+            model.encode(["query: warm-up"])  # compile now rather than on the first request
+        except Exception as e:
+            print(f"[!] torch.compile unavailable, running eager: {e}")
+            model[0].auto_model = eager
+        return model
+    onnx_name = onnx_dir or name
+    onnx_qint8 = _onnx_qint8_file(onnx_name) if backend == "onnx" else None
+    if not onnx_qint8 and _cpu_has_bf16():
+        # bf16 halves the memory traffic per matmul; embeddings are L2-normalized in fp32 by the caller
+        return SentenceTransformer(name, model_kwargs={"torch_dtype": torch.bfloat16})
+    if backend == "onnx":
+        file_name = onnx_qint8 or ONNX_FP32_FILE
+        try:
+            import onnxruntime as ort
+            opts = ort.SessionOptions()
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            if num_threads:
+                opts.intra_op_num_threads = num_threads
+            return SentenceTransformer(onnx_name, backend="onnx",
+                                       model_kwargs={"file_name": file_name, "session_options": opts})
+        except Exception as e:
+            print(f"[!] ONNX backend unavailable, using PyTorch: {e}")
+    return SentenceTransformer(name)
+
+
+def load_indices(nprobe=16, num_threads=None) -> Indices:
+    """Load BM25, FAISS, meta and the encoder (the ONNX export when present) concurrently.
+
+    num_threads caps both the encoder's forward pass and FAISS's OpenMP search threads.
+    """
+    if num_threads:
+        faiss.omp_set_num_threads(num_threads)
+    # The four loads are independent file reads / deserializations; the model dominates
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        f_bm25 = pool.submit(load_bm25, BM25_PATH)
+        f_faiss = pool.submit(load_faiss, FAISS_PATH, nprobe=nprobe)
+        f_meta = pool.submit(load_meta, META_PATH)
+        f_model = pool.submit(load_model, MODEL_NAME, num_threads=num_threads,
+                              onnx_dir=ONNX_MODEL_DIR if os.path.isdir(ONNX_MODEL_DIR) else None)
+        return Indices(bm25=f_bm25.result(), faiss_index=f_faiss.result(),
+                       meta=f_meta.result(), model=f_model.result())
+
+
+@lru_cache(maxsize=1)
+def get_indices() -> Indices:
+    """Process-wide Indices for scripts and notebooks, loaded on first use.
+
+    Repeated evaluations in one process (e.g. an alpha sweep) reuse the loaded indices
+    and their query-embedding cache.
+    """
+    return load_indices()
 
 
 # --------------------------- Utilities ---------------------------
@@ -31,223 +270,288 @@ def minmax_norm(a: np.ndarray) -> np.ndarray:
     return np.zeros_like(a) if mx - mn < 1e-9 else (a - mn) / (mx - mn)
 
 
-def highlight_text(text: str, yellow_terms: list[str], green_terms: list[str]) -> str:
-    """Highlight exact matches (yellow) and semantic/synonym matches (green) showing actual found words."""
-    # Store original text for comparison
-    original_text = text
-    
-    # Combine and clean all terms
-    all_yellow_terms = []
-    for term in yellow_terms:
-        if term and len(term.strip()) > 1:
-            all_yellow_terms.append(term.strip())
-            # Add partial matches for compound terms
-            if len(term.strip()) > 4:
-                words = term.split()
-                if len(words) > 1:
-                    all_yellow_terms.extend([w for w in words if len(w) > 2])
-    
-    all_green_terms = []
-    for term in green_terms:
+def top_k_desc(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first; equal scores rank the higher index first.
+
+    Uses argpartition, so only the k selected entries are sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)
+        sel = np.concatenate([above, ties[len(ties) - (k - len(above)):]])
+    else:
+        sel = np.arange(n)
+    return sel[np.lexsort((sel, scores[sel]))[::-1]]
+
+
+def fused_score(bm: np.ndarray, vc: np.ndarray, alpha: float) -> np.ndarray:
+    """alpha * minmax_norm(vc) + (1 - alpha) * minmax_norm(bm), in place on one output array."""
+    if bm.size == 0:
+        return np.zeros(0)
+    vmin, vrange = vc.min(), np.ptp(vc)
+    bmin, brange = bm.min(), np.ptp(bm)
+    # A constant score vector normalizes to zeros, as in minmax_norm
+    final = np.subtract(vc, vmin, dtype=np.float64)
+    final *= alpha / vrange if vrange >= 1e-9 else 0.0
+    bm_part = np.subtract(bm, bmin, dtype=np.float64)
+    bm_part *= (1 - alpha) / brange if brange >= 1e-9 else 0.0
+    final += bm_part
+    return final
+
+
+@lru_cache(maxsize=4096)
+def _compiled(pattern: str, flags: int = re.IGNORECASE) -> re.Pattern:
+    return re.compile(pattern, flags)
+
+
+_LATIN_RE = re.compile(r'^[a-zA-Z\s]+$')
+_ARABIC_RE = re.compile(r'^[\u0600-\u06FF\s]+$')
+
+
+# Highlight colours live in the page stylesheet (mark.y / mark.g)
+_YELLOW_MARK = '<mark class="y">{0}</mark>'
+_GREEN_MARK = '<mark class="g">{0}</mark>'
+
+
+def _highlight_terms(terms: list[str]) -> list[str]:
+    """Clean highlight terms and add the words of compound terms as partial matches."""
+    out = []
+    for term in terms:
         if term and len(term.strip()) > 1:
-            all_green_terms.append(term.strip())
+            out.append(term.strip())
             # Add partial matches for compound terms
             if len(term.strip()) > 4:
                 words = term.split()
                 if len(words) > 1:
-                    all_green_terms.extend([w for w in words if len(w) > 2])
-    
-    # First pass: yellow highlights for exact query matches
-    yellow_positions = []
-    for term in sorted(set(all_yellow_terms), key=len, reverse=True):
-        if not term.strip(): continue
-        
-        # Try both exact match and word boundary match
-        patterns = [
-            re.compile(re.escape(term), re.IGNORECASE),
-            re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-        ]
-        
-        for pattern in patterns:
-            try:
-                for match in pattern.finditer(text):
+                    out.extend([w for w in words if len(w) > 2])
+    return out
+
+
+def _prefix_pattern(term: str, min_len: int = 3) -> str:
+    """Regex matching the longest prefix of term that is at least min_len characters."""
+    tail = ""
+    for ch in reversed(term[min_len:]):
+        tail = "(?:" + re.escape(ch) + tail + ")?"
+    return re.escape(term[:min_len]) + tail
+
+
+class Highlighter:
+    """
+    Highlights one query's terms in its result snippets.
+
+    Term cleanup, yellow/green deduplication and pattern compilation happen once
+    per query instead of once per snippet.
+    """
+
+    def __init__(self, yellow_terms: list[str], green_terms: list[str]):
+        all_yellow_terms = _highlight_terms(yellow_terms)
+        all_green_terms = _highlight_terms(green_terms)
+        # Limit to avoid performance issues
+        fallback_terms = (all_yellow_terms + all_green_terms)[:10]
+        self.fallback_patterns = [_compiled(_prefix_pattern(term)) for term in fallback_terms if len(term) > 3]
+
+        # Longest terms first; a term's \b-bounded matches are a subset of its
+        # plain matches, so the plain pattern alone finds every span
+        self.yellow_patterns = [_compiled(re.escape(term))
+                                for term in sorted(set(all_yellow_terms), key=len, reverse=True)]
+        # Skip green terms that are already yellow terms
+        yellow_norms = {normalize_ar(term) for term in all_yellow_terms}
+        self.green_patterns = [_compiled(re.escape(term))
+                               for term in sorted(set(all_green_terms), key=len, reverse=True)
+                               if normalize_ar(term) not in yellow_norms]
+
+    def __call__(self, text: str) -> str:
+        """Highlight exact matches (yellow) and semantic/synonym matches (green) showing actual found words."""
+        # First pass: yellow highlights for exact query matches
+        yellow_positions = []
+        seen = set()
+        yellow_mask = bytearray(len(text))
+        for pattern in self.yellow_patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                if (start, end) not in seen:
+                    seen.add((start, end))
                     # Use the actual matched text (preserves original case)
-                    actual_match = text[match.start():match.end()]
-                    # Avoid duplicates
-                    pos_key = (match.start(), match.end())
-                    if not any(pos_key == (start, end) for start, end, _ in yellow_positions):
-                        yellow_positions.append((match.start(), match.end(), actual_match))
-            except re.error:
-                continue
-    
-    # Second pass: green highlights for semantic matches (avoid overlap with yellow)
-    green_positions = []
-    for term in sorted(set(all_green_terms), key=len, reverse=True):
-        if not term.strip(): continue
-        
-        # Skip if this term is already in yellow terms
-        if any(normalize_ar(term) == normalize_ar(y_term) for y_term in all_yellow_terms):
-            continue
-        
-        # Try both exact match and word boundary match
-        patterns = [
-            re.compile(re.escape(term), re.IGNORECASE),
-            re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
+                    yellow_positions.append((start, end, match.group()))
+                    yellow_mask[start:end] = b'\x01' * (end - start)
+
+        # Second pass: green highlights for semantic matches (avoid overlap with yellow)
+        green_positions = []
+        seen = set()
+        for pattern in self.green_patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                if (start, end) not in seen and yellow_mask.find(1, start, end) == -1:
+                    seen.add((start, end))
+                    green_positions.append((start, end, match.group()))
+
+        # If no highlights found, fall back to the longest partial (prefix) match
+        # of the first fallback term that occurs at all
+        if not yellow_positions and not green_positions:
+            for pattern in self.fallback_patterns:
+                best = max(pattern.finditer(text), key=lambda m: m.end() - m.start(), default=None)
+                if best is not None:
+                    green_positions.append((best.start(), best.end(), best.group()))
+                    break
+
+        all_highlights = [
+            (start, end, _YELLOW_MARK.format(found_word)) for start, end, found_word in yellow_positions
+        ] + [
+            (start, end, _GREEN_MARK.format(found_word)) for start, end, found_word in green_positions
         ]
-        
-        for pattern in patterns:
-            try:
-                for match in pattern.finditer(original_text):
-                    start, end = match.start(), match.end()
-                    
-                    # Check if this position overlaps with any yellow highlight
-                    overlaps = any(start < y_end and end > y_start for y_start, y_end, _ in yellow_positions)
-                    if not overlaps:
-                        # Use the actual matched text (preserves original case and form)
-                        actual_match = original_text[start:end]
-                        # Avoid duplicates
-                        pos_key = (start, end)
-                        if not any(pos_key == (s, e) for s, e, _ in green_positions):
-                            green_positions.append((start, end, actual_match))
-            except re.error:
-                continue
-    
-    # If no highlights found, try more aggressive partial matching
-    if not yellow_positions and not green_positions:
-        # Try partial matches with common words
-        common_terms = all_yellow_terms + all_green_terms
-        for term in common_terms[:10]:  # Limit to avoid performance issues
-            if len(term) > 3:
-                # Try finding any part of the term
-                for i in range(len(term) - 2):
-                    for j in range(i + 3, len(term) + 1):
-                        subterm = term[i:j]
-                        if len(subterm) > 2:
-                            pattern = re.compile(re.escape(subterm), re.IGNORECASE)
-                            for match in pattern.finditer(original_text):
-                                actual_match = original_text[match.start():match.end()]
-                                green_positions.append((match.start(), match.end(), actual_match))
-                                break  # Only first match per subterm
-                    if green_positions:  # Found something, stop searching
-                        break
-            if green_positions:
-                break
-    
-    # Sort all positions by start index (reverse order for replacement)
-    all_highlights = [
-        (start, end, f'<mark style="background:linear-gradient(135deg, #fef08a, #fde047); color:#854d0e; border:1px solid #eab308;" title="Direct match: {found_word}">{found_word}</mark>')
-        for start, end, found_word in yellow_positions
-    ] + [
-        (start, end, f'<mark style="background:linear-gradient(135deg, #bbf7d0, #86efac); color:#14532d; border:1px solid #22c55e;" title="Semantic match: {found_word}">{found_word}</mark>')
-        for start, end, found_word in green_positions
-    ]
-    
-    # Remove overlapping highlights (keep longer ones)
-    filtered_highlights = []
-    for highlight in sorted(all_highlights, key=lambda x: x[1] - x[0], reverse=True):
-        start, end, replacement = highlight
-        overlaps = any(start < f_end and end > f_start for f_start, f_end, _ in filtered_highlights)
-        if not overlaps:
-            filtered_highlights.append(highlight)
-    
-    # Sort by position (reverse order for safe replacement)
-    filtered_highlights.sort(key=lambda x: x[0], reverse=True)
-    
-    # Apply highlights
-    result = original_text
-    for start, end, replacement in filtered_highlights:
-        result = result[:start] + replacement + result[end:]
-    
-    return result
+
+        # Remove overlapping highlights (keep longer ones)
+        filtered_highlights = []
+        taken = bytearray(len(text))
+        for start, end, replacement in sorted(all_highlights, key=lambda x: x[1] - x[0], reverse=True):
+            if taken.find(1, start, end) == -1:
+                taken[start:end] = b'\x01' * (end - start)
+                filtered_highlights.append((start, end, replacement))
+
+        # Apply highlights in one left-to-right join
+        filtered_highlights.sort(key=lambda x: x[0])
+        parts = []
+        pos = 0
+        for start, end, replacement in filtered_highlights:
+            parts.append(text[pos:start])
+            parts.append(replacement)
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+def highlight_text(text: str, yellow_terms: list[str], green_terms: list[str]) -> str:
+    """Highlight exact matches (yellow) and semantic/synonym matches (green) showing actual found words."""
+    return Highlighter(yellow_terms, green_terms)(text)
+
+
+GLOSSARY_PATH = "conf/glossary_ar.json"
+
+
+def _glossary_mtime(path: str) -> float | None:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=4)
+def _read_glossary(path: str, mtime: float) -> dict:
+    # mtime is part of the cache key so an edited glossary is picked up
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def load_glossary(path=GLOSSARY_PATH) -> dict:
+    mtime = _glossary_mtime(path)
+    return _read_glossary(path, mtime) if mtime is not None else {}
+
+
+@lru_cache(maxsize=4)
+def _read_glossary_entries(path: str, mtime: float) -> list[tuple]:
+    return _glossary_entries(_read_glossary(path, mtime))
 
 
-def load_glossary(path="conf/glossary_ar.json") -> dict:
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+@lru_cache(maxsize=4096)
+def _expand_terms_cached(query: str, path: str, mtime: float | None) -> tuple[str, ...]:
+    entries = _read_glossary_entries(path, mtime) if mtime is not None else []
+    return tuple(_expand_terms(query, entries))
+
+
+def expand_glossary_terms(query: str, path=GLOSSARY_PATH) -> list[str]:
+    """Memoized expand_terms_from_glossary over the glossary file at path."""
+    return list(_expand_terms_cached(query, path, _glossary_mtime(path)))
+
+
+# Common legal/nuclear terms that might be semantically related
+_COMMON_LEGAL_TERMS = {
+    'treaty': ['اتفاقية', 'معاهدة', 'اتفاق', 'ميثاق', 'عقد'],
+    'agreement': ['اتفاقية', 'اتفاق', 'معاهدة', 'عقد'],
+    'obligation': ['التزام', 'التزامات', 'واجب', 'واجبات'],
+    'responsibility': ['مسؤولية', 'مسؤوليات'],
+    'compensation': ['تعويض', 'تعويضات'],
+    'license': ['ترخيص', 'تراخيص', 'رخصة', 'إذن'],
+    'nuclear': ['نووي', 'ذري', 'نووية', 'ذرية'],
+    'radiation': ['إشعاع', 'إشعاعي', 'إشعاعية'],
+    'safety': ['أمان', 'أمن', 'سلامة'],
+    'authority': ['هيئة', 'سلطة', 'جهة'],
+    'regulation': ['نظام', 'لائحة', 'تنظيم'],
+    'اتفاقية': ['treaty', 'agreement', 'معاهدة', 'اتفاق', 'عقد'],
+    'التزام': ['obligation', 'واجب', 'التزامات'],
+    'مسؤولية': ['responsibility', 'مسؤوليات'],
+    'ترخيص': ['license', 'رخصة', 'إذن', 'تراخيص'],
+    'نووي': ['nuclear', 'ذري', 'نووية'],
+    'هيئة': ['authority', 'سلطة', 'جهة']
+}
+
+
+def _glossary_entries(glossary: dict) -> list[tuple]:
+    """Precompute the normalized/lowercased forms and the expansion of every glossary entry."""
+    entries = []
+    for main_term, synonyms in glossary.items():
+        # Both the main term and all synonyms, plus word parts for compound terms
+        expansion = [main_term, *synonyms]
+        if ' ' in main_term:
+            expansion.extend([word for word in main_term.split() if len(word) > 2])
+        for syn in synonyms:
+            if ' ' in syn:
+                expansion.extend([word for word in syn.split() if len(word) > 2])
+        syn_forms = [(normalize_ar(syn), syn.lower(), len(syn) > 3) for syn in synonyms]
+        entries.append((normalize_ar(main_term), main_term.lower(), syn_forms, expansion))
+    return entries
 
 
 def expand_terms_from_glossary(query: str, glossary: dict) -> list[str]:
     """Return semantically related terms from glossary with better matching."""
-    q_tokens = tokenize_ar(query)
-    q_normalized = normalize_ar(query)
+    return _expand_terms(query, _glossary_entries(glossary))
+
+
+def _expand_terms(query: str, entries: list[tuple]) -> list[str]:
+    q_normalized, q_tokens = _prepare_query(query)
     original_query = query.strip().lower()
     expanded = []
     
     # Direct term matching with more flexible criteria
-    for main_term, synonyms in glossary.items():
-        norm_main_term = normalize_ar(main_term)
-        norm_syns = [normalize_ar(s) for s in synonyms]
-        
+    for norm_main_term, main_lower, syn_forms, expansion in entries:
         # Check if query contains the main term or its synonyms
-        main_term_matches = any(
-            token in norm_main_term or norm_main_term in q_normalized or 
-            token in main_term.lower() or main_term.lower() in original_query
-            for token in q_tokens
+        main_term_matches = bool(q_tokens) and (
+            norm_main_term in q_normalized or main_lower in original_query or
+            any(token in norm_main_term or token in main_lower for token in q_tokens)
         )
         
         synonym_matches = any(
             any(token in norm_syn or norm_syn in token or 
-                token in syn.lower() or syn.lower() in original_query
+                token in syn_lower or syn_lower in original_query
                 for token in q_tokens)
-            for norm_syn, syn in zip(norm_syns, synonyms)
+            for norm_syn, syn_lower, _ in syn_forms
         )
         
         # Also check partial matches for longer terms
         partial_matches = False
         if len(original_query) > 4:
             partial_matches = (
-                original_query in main_term.lower() or main_term.lower() in original_query or
-                any(original_query in syn.lower() or syn.lower() in original_query 
-                    for syn in synonyms if len(syn) > 3)
+                original_query in main_lower or main_lower in original_query or
+                any(original_query in syn_lower or syn_lower in original_query 
+                    for _, syn_lower, is_long in syn_forms if is_long)
             )
         
         if main_term_matches or synonym_matches or partial_matches:
-            # Add both the main term and all synonyms
-            expanded.append(main_term)
-            expanded.extend(synonyms)
-            
-            # Add word parts for compound terms
-            if ' ' in main_term:
-                expanded.extend([word for word in main_term.split() if len(word) > 2])
-            for syn in synonyms:
-                if ' ' in syn:
-                    expanded.extend([word for word in syn.split() if len(word) > 2])
-    
-    # Add common legal/nuclear terms that might be semantically related
-    common_legal_terms = {
-        'treaty': ['اتفاقية', 'معاهدة', 'اتفاق', 'ميثاق', 'عقد'],
-        'agreement': ['اتفاقية', 'اتفاق', 'معاهدة', 'عقد'],
-        'obligation': ['التزام', 'التزامات', 'واجب', 'واجبات'],
-        'responsibility': ['مسؤولية', 'مسؤوليات'],
-        'compensation': ['تعويض', 'تعويضات'],
-        'license': ['ترخيص', 'تراخيص', 'رخصة', 'إذن'],
-        'nuclear': ['نووي', 'ذري', 'نووية', 'ذرية'],
-        'radiation': ['إشعاع', 'إشعاعي', 'إشعاعية'],
-        'safety': ['أمان', 'أمن', 'سلامة'],
-        'authority': ['هيئة', 'سلطة', 'جهة'],
-        'regulation': ['نظام', 'لائحة', 'تنظيم'],
-        'اتفاقية': ['treaty', 'agreement', 'معاهدة', 'اتفاق', 'عقد'],
-        'التزام': ['obligation', 'واجب', 'التزامات'],
-        'مسؤولية': ['responsibility', 'مسؤوليات'],
-        'ترخيص': ['license', 'رخصة', 'إذن', 'تراخيص'],
-        'نووي': ['nuclear', 'ذري', 'نووية'],
-        'هيئة': ['authority', 'سلطة', 'جهة']
-    }
+            expanded.extend(expansion)
     
     # Check common terms
-    for term_key, term_synonyms in common_legal_terms.items():
-        if (term_key.lower() in original_query or original_query in term_key.lower() or
-            any(token in term_key.lower() for token in q_tokens)):
+    for term_key, term_synonyms in _COMMON_LEGAL_TERMS.items():
+        if (term_key in original_query or original_query in term_key or
+            any(token in term_key for token in q_tokens)):
             expanded.extend(term_synonyms)
     
     # Remove duplicates and filter out very short terms
-    unique_expanded = []
-    for term in expanded:
-        term_clean = term.strip()
-        if len(term_clean) > 1 and term_clean not in unique_expanded:
-            unique_expanded.append(term_clean)
+    unique_expanded = list(dict.fromkeys(
+        term_clean for term_clean in (term.strip() for term in expanded) if len(term_clean) > 1
+    ))
     
     # Limit to reasonable number to avoid performance issues
     return unique_expanded[:50]
@@ -255,88 +559,140 @@ def expand_terms_from_glossary(query: str, glossary: dict) -> list[str]:
 
 # --------------------------- Core Search ---------------------------
 
-def search(indices: Indices, query: str, roles: list[str],
-           topk=5, bm25_k=50, vec_k=50, alpha=0.7):
-
-    q_tokens = tokenize_ar(query)
+@lru_cache(maxsize=2048)
+def _prepare_query(query: str) -> tuple[str, tuple[str, ...]]:
+    """Normalize a query once and tokenize the normalized form (normalization is idempotent)."""
     q_norm = normalize_ar(query)
+    return q_norm, tuple(tokenize_ar(q_norm))
+
+
+def _rank_query(indices: Indices, query: str, roles: list[str],
+                vec_ranks: np.ndarray, vec_scores: np.ndarray,
+                topk: int, bm25_k: int, alpha: float,
+                doc_filter: Callable[[str], bool] | None = None) -> dict:
+    """Fuse BM25 with the query's FAISS hits and build the highlighted results."""
+    _, q_tokens = _prepare_query(query)
     original_query = query.strip()
 
     # Load glossary
     glossary = load_glossary()
 
     # Expand with semantic synonyms
-    green_terms = expand_terms_from_glossary(query, glossary)
+    green_terms = expand_glossary_terms(query)
     
     # Create comprehensive yellow terms (direct matches)
-    yellow_terms = list(set(q_tokens + [original_query]))
+    yellow_terms = list(set(q_tokens + (original_query,)))
     
     # Add English-Arabic cross matches if query is in English
-    if re.match(r'^[a-zA-Z\s]+$', original_query.strip()):
+    if _LATIN_RE.match(original_query.strip()):
         # Query is in English, look for Arabic translations in glossary
         english_query = original_query.lower()
         for main_term, synonyms in glossary.items():
             if any(english_query in syn.lower() or syn.lower() in english_query 
-                   for syn in synonyms if re.match(r'^[a-zA-Z\s]+$', syn)):
+                   for syn in synonyms if _LATIN_RE.match(syn)):
                 yellow_terms.extend([main_term] + synonyms)
     
     # Add Arabic-English cross matches if query is in Arabic
-    elif re.match(r'^[\u0600-\u06FF\s]+$', original_query.strip()):
+    elif _ARABIC_RE.match(original_query.strip()):
         # Query is in Arabic, look for English translations
         for main_term, synonyms in glossary.items():
             if (original_query in main_term or main_term in original_query or
                 any(original_query in syn or syn in original_query for syn in synonyms)):
                 # Add English synonyms to yellow terms
-                english_synonyms = [syn for syn in synonyms if re.match(r'^[a-zA-Z\s]+$', syn)]
+                english_synonyms = [syn for syn in synonyms if _LATIN_RE.match(syn)]
                 yellow_terms.extend(english_synonyms)
 
     # BM25
     bm25_scores = indices.bm25.get_scores(q_tokens)
-    bm25_ranks = np.argsort(bm25_scores)[::-1][:bm25_k]
-
-    # FAISS
-    q_emb = indices.model.encode([q_norm], normalize_embeddings=True)
-    D, I = indices.faiss_index.search(np.asarray(q_emb, dtype="float32"), vec_k)
-    vec_ranks, vec_scores = I[0], D[0]
+    bm25_ranks = top_k_desc(bm25_scores, bm25_k)
 
     # Combine
-    cand_ids = list(set(bm25_ranks.tolist()) | set(vec_ranks.tolist()))
-    bm = np.array([bm25_scores[i] for i in cand_ids])
-    vec_ranks_list = vec_ranks.tolist() if hasattr(vec_ranks, "tolist") else vec_ranks
-    vc = np.array([vec_scores[vec_ranks_list.index(i)] if i in vec_ranks_list else 0.0 for i in cand_ids])
-    bm_n, vc_n = minmax_norm(bm), minmax_norm(vc)
-    final = alpha * vc_n + (1 - alpha) * bm_n
-    order = np.argsort(final)[::-1]
+    vec_map = dict(zip(vec_ranks.tolist(), vec_scores.tolist()))
+    vec_map.pop(-1, None)  # FAISS pads missing neighbours with -1
+    cand_ids = np.fromiter(set(bm25_ranks.tolist()) | vec_map.keys(), dtype=np.int64)
+    bm = bm25_scores[cand_ids]
+    vc = np.fromiter((vec_map.get(i, 0.0) for i in cand_ids.tolist()), dtype=np.float64, count=len(cand_ids))
+    final = fused_score(bm, vc, alpha)
 
-    results = []
-    for j in order:
-        idx = cand_ids[j]
-        meta = indices.meta[idx]
+    # RBAC filter - check document-level access. Denied candidates are dropped
+    # before ranking; scores stay normalized over the full candidate set
+    meta = indices.meta
+    if roles:
+        allowed = meta.allowed(cand_ids, roles)
+        cand_ids, final = cand_ids[allowed], final[allowed]
+    order = top_k_desc(final, topk)
 
-        # RBAC filter - check document-level access
-        doc_roles = meta.get("roles", [])
-        if roles and not (set(roles) & set(doc_roles)):
+    highlighter = Highlighter(yellow_terms, green_terms)
+    results = []
+    for rank, j in enumerate(order, 1):
+        idx = int(cand_ids[j])
+        # File-level access check: denied documents are dropped before being highlighted
+        if doc_filter is not None and not doc_filter(meta.doc_ids[idx]):
             continue
-
-        snippet = meta["text"][:700].replace("\n", " ")
-        highlighted = highlight_text(snippet, yellow_terms=yellow_terms, green_terms=green_terms)
-
-        pages = meta.get("pages", [])
-        page_start = pages[0] if pages else meta.get("page_start")
-        page_end = pages[-1] if pages else meta.get("page_end")
-
         results.append({
-            "rank": len(results) + 1,
-            "doc_id": meta["doc_id"],
-            "article_no": meta.get("article_no"),
-            "page_start": page_start,
-            "page_end": page_end,
+            "rank": rank,
+            "doc_id": meta.doc_ids[idx],
+            "article_no": meta.article_nos[idx],
+            "page_start": meta.page_starts[idx],
+            "page_end": meta.page_ends[idx],
             "score": float(final[j]),
-            "excerpt": highlighted
+            "excerpt": highlighter(meta.snippets[idx])
         })
 
-        if len(results) >= topk:
-            break
+    if results:
+        answer_html = results[0]["excerpt"]
+    elif len(order):
+        answer_html = "لم يتم العثور على نتائج متاحة بناءً على صلاحياتك الحالية."
+    else:
+        answer_html = "لم يتم العثور على نتيجة ذات صلة."
+    return {"answer": answer_html, "results": results,
+            "total_found": len(order), "accessible_results": len(results)}
+
+
+def encode_queries(indices: Indices, texts: list[str]) -> np.ndarray:
+    """fp32 L2-normalized embeddings of the texts; only texts not seen recently reach the encoder."""
+    cache = indices.query_embeddings
+    unique = list(dict.fromkeys(texts))
+    # Snapshot the hits under the lock: another batch may evict them while this one encodes
+    with indices.query_embeddings_lock:
+        found = {t: cache[t] for t in unique if t in cache}
+        for t in found:
+            cache.move_to_end(t)
+    missing = [t for t in unique if t not in found]
+    if missing:
+        embs = np.asarray(indices.model.encode(missing, batch_size=32), dtype="float32")
+        # Normalize in fp32 so a reduced-precision encoder doesn't lose accuracy in the norm
+        embs /= np.maximum(np.linalg.norm(embs, axis=1, keepdims=True), 1e-12)
+        fresh = dict(zip(missing, embs))
+        with indices.query_embeddings_lock:
+            cache.update(fresh)
+            while len(cache) > QUERY_EMBED_CACHE_SIZE:
+                cache.popitem(last=False)
+        found.update(fresh)
+    return np.vstack([found[t] for t in texts])
 
-    answer_html = results[0]["excerpt"] if results else "لم يتم العثور على نتيجة ذات صلة."
-    return {"answer": answer_html, "results": results}
+
+def search_batch(indices: Indices, queries: list[str], roles: list[str],
+                 topk=5, bm25_k=50, vec_k=50, alpha=0.7,
+                 doc_filter: Callable[[str], bool] | None = None) -> list[dict]:
+    """Search several queries at once: one encoder call and one FAISS search for the batch.
+
+    doc_filter(doc_id) -> bool, when given, hides top-k documents the caller may not open;
+    total_found still counts them.
+    """
+    if not queries:
+        return []
+
+    # FAISS
+    q_embs = encode_queries(indices, [_prepare_query(q)[0] for q in queries])
+    D, I = indices.faiss_index.search(q_embs, vec_k)
+
+    # BM25 has no batch API, so the fusion runs per query
+    return [_rank_query(indices, q, roles, I[i], D[i], topk, bm25_k, alpha, doc_filter)
+            for i, q in enumerate(queries)]
+
+
+def search(indices: Indices, query: str, roles: list[str],
+           topk=5, bm25_k=50, vec_k=50, alpha=0.7, doc_filter=None):
+    return search_batch(indices, [query], roles, topk=topk, bm25_k=bm25_k,
+                        vec_k=vec_k, alpha=alpha, doc_filter=doc_filter)[0]
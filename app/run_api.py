@@ -1,59 +1,202 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, Response
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer
-from pydantic import BaseModel
-import os, json
-from .retrieval import load_bm25, load_faiss, load_meta, load_model, Indices, search
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, Field, StringConstraints
+import os, sys, gc, time, asyncio, gzip, hashlib
+import brotli, orjson
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from .retrieval import load_indices, Indices, search_batch, BM25_PATH, FAISS_PATH, META_PATH
 from .auth import (
     User, UserCreate, UserLogin, Token, authenticate_user, create_access_token,
-    get_current_user, require_roles, check_file_access, filter_documents_by_access,
-    get_effective_roles, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_user, require_roles, document_filter,
+    get_effective_roles, ACCESS_TOKEN_EXPIRE_MINUTES, USERS_DB
 )
 from datetime import timedelta
+from pathlib import Path
+from typing import Annotated
 
-# ---- Paths ----
-BM25_PATH = "data/idx/bm25.pkl"
-FAISS_PATH = "data/idx/mE5.faiss"
-META_PATH = "data/idx/meta.json"
-MODEL_NAME = "intfloat/multilingual-e5-base"
+# IVF lists probed per query; see scripts/07_rebuild_faiss.py for the recall it buys
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
 
-app = FastAPI(title="Arabic Legal Q&A")
+class QueryBatcher:
+    """
+    Coalesces concurrent /ask queries into search_batch calls.
 
-indices: Indices | None = None
+    A lone query runs immediately; queries arriving while a batch is in flight
+    wait for it and then share one encoder pass and one FAISS search.
+    """
 
+    def __init__(self, indices: Indices):
+        self.indices = indices
+        self._pending: list[tuple[str, tuple[str, ...], int, tuple[str, ...], asyncio.Future]] = []
+        # Held so the event loop's weak reference is not the only one keeping the drain alive
+        self._drain_task: asyncio.Task | None = None
+
+    async def search(self, query: str, roles: list[str], topk: int, user_roles: list[str]) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((query, tuple(roles), topk, tuple(user_roles), future))
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                groups: dict[tuple, list[tuple[str, asyncio.Future]]] = {}
+                for query, roles, topk, user_roles, future in batch:
+                    groups.setdefault((roles, topk, user_roles), []).append((query, future))
+                for (roles, topk, user_roles), items in groups.items():
+                    queries = [query for query, _ in items]
+                    try:
+                        outs = await loop.run_in_executor(
+                            None, partial(search_batch, self.indices, queries, list(roles),
+                                          topk=topk, doc_filter=document_filter(user_roles)))
+                    except Exception as e:
+                        for _, future in items:
+                            if not future.done():
+                                future.set_exception(e)
+                        continue
+                    for (_, future), out in zip(items, outs):
+                        if not future.done():
+                            future.set_result(out)
+        finally:
+            self._drain_task = None
+
+
+# /ask responses (dict and encoded bytes) keyed by (query, user roles, topk); cleared on index load
+ASK_CACHE_SIZE = 1024
+_ask_cache: OrderedDict[tuple, tuple[dict, bytes]] = OrderedDict()
+
+# The page's example tags (see _HOME_HTML), which static/app.js asks for with topk 8; warmed at startup
+EXAMPLE_QUERIES = ("obligations", "اتفاقية", "الطاقة النووية", "تعويض", "ترخيص")
+EXAMPLE_TOPK = 8
+
+
+# Out-of-range inputs are rejected with 422 before they reach the encoder and FAISS
+MAX_QUERY_CHARS = 512
+MAX_TOPK = 50
+
+
+# Shared by POST /ask's body and GET /ask's query string, so both reject blank queries alike
+QueryText = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_QUERY_CHARS)]
 
 class AskPayload(BaseModel):
-    query: str
-    topk: int = 5
+    query: QueryText
+    topk: int = Field(5, ge=1, le=MAX_TOPK)
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
 
-@app.on_event("startup")
-def load_all():
-    global indices
+def threads_per_worker() -> int:
+    """CPU threads each worker's encoder may use: OMP_NUM_THREADS, else the cores split across workers."""
+    if os.getenv("OMP_NUM_THREADS"):
+        return max(1, int(os.environ["OMP_NUM_THREADS"]))
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def load_all() -> Indices:
     print("[Loading BM25 + FAISS + model...]")
-    bm25 = load_bm25(BM25_PATH)
-    faiss_index = load_faiss(FAISS_PATH)
-    meta = load_meta(META_PATH)
-    model = load_model(MODEL_NAME)
-    indices = Indices(bm25=bm25, faiss_index=faiss_index, meta=meta, model=model)
+    # Without a cap every worker's forward pass grabs all cores and they thrash each other
+    # (torch and faiss are already imported, so the cap is set through their APIs, not env vars)
+    threads = threads_per_worker()
+    indices = load_indices(nprobe=FAISS_NPROBE, num_threads=threads)
+    _ask_cache.clear()
     print("[OK] System ready")
+    return indices
+
+
+def index_version() -> str:
+    """Fingerprint of the index files on disk, identical across workers loading the same build."""
+    stamps = [f"{os.stat(p).st_mtime_ns}:{os.stat(p).st_size}" for p in (BM25_PATH, FAISS_PATH, META_PATH)]
+    return hashlib.blake2b(";".join(stamps).encode("utf-8"), digest_size=8).hexdigest()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.indices = load_all()
+    app.state.index_version = index_version()
+    app.state.batcher = QueryBatcher(app.state.indices)
+    await warm_ask_cache(app.state.batcher)
+    yield
+    # Drop the model and the FAISS mapping so a recycled worker frees its memory promptly
+    del app.state.batcher, app.state.indices
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves the listed paths uncompressed.
+
+    Streamed gzip holds each chunk in the compressor until the response ends, so NDJSON
+    lines would only reach the browser together with the last one.
+    """
+
+    def __init__(self, app, exclude_paths=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="Arabic Legal Q&A", default_response_class=ORJSONResponse, lifespan=lifespan)
+# Compresses /ask JSON on the fly; responses that already set Content-Encoding pass through
+app.add_middleware(StreamAwareGZipMiddleware, exclude_paths=("/ask/stream",), minimum_size=512, compresslevel=6)
+
+
+# Probes hit /health every few seconds; both possible answers are built once
+_HEALTH_OK = Response(orjson.dumps({"status": "healthy", "message": "System is ready"}),
+                      media_type="application/json")
+_HEALTH_LOADING = Response(orjson.dumps({"status": "loading", "message": "System is still loading"}),
+                           media_type="application/json")
 
 
 @app.get("/health")
-def health_check():
+async def health_check(request: Request):
     """Health check endpoint for Docker"""
-    if indices is None:
-        return {"status": "loading", "message": "System is still loading"}
-    return {"status": "healthy", "message": "System is ready"}
+    # async def: answered on the event loop without a threadpool hop
+    if getattr(request.app.state, "indices", None) is None:
+        return _HEALTH_LOADING
+    return _HEALTH_OK
 
 
-@app.get("/", response_class=HTMLResponse)
-def home():
-    return HTMLResponse("""
+# Page stylesheet and script; URLs carry a content hash so browsers may cache them forever
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles whose responses are cacheable for a year (URLs change with the content)."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def _asset_url(name: str) -> str:
+    digest = hashlib.sha256((STATIC_DIR / name).read_bytes()).hexdigest()[:8]
+    return f"/static/{name}?v={digest}"
+
+
+app.mount("/static", ImmutableStaticFiles(directory=STATIC_DIR), name="static")
+
+
+_HOME_HTML = f"""
 <!DOCTYPE html>
 <html lang="ar" dir="rtl">
 <head>
@@ -61,451 +204,7 @@ def home():
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>🔍 الباحث القانوني النووي ⚖️</title>
 <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+Arabic:wght@300;400;600;700&display=swap" rel="stylesheet">
-<style>
-:root {
-  --primary-color: #1e40af;
-  --primary-hover: #1d4ed8;
-  --secondary-color: #64748b;
-  --success-color: #059669;
-  --warning-color: #d97706;
-  --error-color: #dc2626;
-  --background: #f8fafc;
-  --card-bg: #ffffff;
-  --text-primary: #1e293b;
-  --text-secondary: #64748b;
-  --border-color: #e2e8f0;
-  --shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-  --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-}
-
-* {
-  box-sizing: border-box;
-  margin: 0;
-  padding: 0;
-}
-
-body {
-  font-family: 'Noto Sans Arabic', 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-  background: var(--background);
-  color: var(--text-primary);
-  direction: rtl;
-  text-align: right;
-  line-height: 1.6;
-  min-height: 100vh;
-}
-
-.header {
-  background: linear-gradient(135deg, var(--primary-color), var(--primary-hover));
-  color: white;
-  padding: 2rem 0;
-  text-align: center;
-  box-shadow: var(--shadow-lg);
-  position: relative;
-}
-
-.header h1 {
-  font-size: 2.5rem;
-  font-weight: 700;
-  margin-bottom: 0.5rem;
-  text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-}
-
-.header p {
-  font-size: 1.1rem;
-  opacity: 0.9;
-  font-weight: 300;
-}
-
-.user-info {
-  position: absolute;
-  top: 1rem;
-  left: 1rem;
-  background: rgba(255, 255, 255, 0.1);
-  padding: 0.5rem 1rem;
-  border-radius: 20px;
-  font-size: 0.9rem;
-  backdrop-filter: blur(10px);
-}
-
-.logout-btn {
-  background: rgba(255, 255, 255, 0.2);
-  border: 1px solid rgba(255, 255, 255, 0.3);
-  color: white;
-  padding: 0.25rem 0.75rem;
-  border-radius: 15px;
-  font-size: 0.8rem;
-  cursor: pointer;
-  margin-right: 0.5rem;
-  transition: all 0.3s ease;
-}
-
-.logout-btn:hover {
-  background: rgba(255, 255, 255, 0.3);
-}
-
-.container {
-  max-width: 1200px;
-  margin: -2rem auto 2rem;
-  background: var(--card-bg);
-  border-radius: 16px;
-  padding: 2rem;
-  box-shadow: var(--shadow-lg);
-  position: relative;
-  z-index: 1;
-}
-
-.login-container {
-  max-width: 400px;
-  margin: 2rem auto;
-  background: var(--card-bg);
-  border-radius: 16px;
-  padding: 2rem;
-  box-shadow: var(--shadow-lg);
-}
-
-.login-form {
-  display: flex;
-  flex-direction: column;
-  gap: 1rem;
-}
-
-.form-group {
-  display: flex;
-  flex-direction: column;
-  gap: 0.5rem;
-}
-
-.form-group label {
-  font-weight: 600;
-  color: var(--text-primary);
-}
-
-.form-group input {
-  padding: 0.75rem 1rem;
-  border: 2px solid var(--border-color);
-  border-radius: 8px;
-  font-size: 1rem;
-  font-family: inherit;
-  transition: all 0.3s ease;
-}
-
-.form-group input:focus {
-  outline: none;
-  border-color: var(--primary-color);
-  box-shadow: 0 0 0 3px rgba(30, 64, 175, 0.1);
-}
-
-.login-btn {
-  padding: 0.75rem 1.5rem;
-  background: linear-gradient(135deg, var(--primary-color), var(--primary-hover));
-  color: white;
-  border: none;
-  border-radius: 8px;
-  font-size: 1rem;
-  font-weight: 600;
-  cursor: pointer;
-  transition: all 0.3s ease;
-}
-
-.login-btn:hover {
-  transform: translateY(-2px);
-  box-shadow: 0 4px 12px rgba(30, 64, 175, 0.3);
-}
-
-.search-box {
-  display: flex;
-  gap: 1rem;
-  margin-bottom: 2rem;
-  align-items: stretch;
-}
-
-#query {
-  flex: 1;
-  padding: 1rem 1.5rem;
-  border: 2px solid var(--border-color);
-  border-radius: 12px;
-  font-size: 1.1rem;
-  font-family: inherit;
-  transition: all 0.3s ease;
-  background: #fafbfc;
-}
-
-#query:focus {
-  outline: none;
-  border-color: var(--primary-color);
-  background: white;
-  box-shadow: 0 0 0 3px rgba(30, 64, 175, 0.1);
-}
-
-#searchBtn {
-  padding: 1rem 2rem;
-  background: linear-gradient(135deg, var(--primary-color), var(--primary-hover));
-  color: white;
-  border: none;
-  border-radius: 12px;
-  font-size: 1.1rem;
-  font-weight: 600;
-  cursor: pointer;
-  transition: all 0.3s ease;
-  white-space: nowrap;
-  min-width: 120px;
-}
-
-#searchBtn:hover {
-  transform: translateY(-2px);
-  box-shadow: 0 4px 12px rgba(30, 64, 175, 0.3);
-}
-
-#searchBtn:active {
-  transform: translateY(0);
-}
-
-.loading {
-  display: none;
-  text-align: center;
-  padding: 1.5rem;
-  color: var(--primary-color);
-  font-size: 1.1rem;
-  font-weight: 500;
-}
-
-.spinner {
-  display: inline-block;
-  width: 20px;
-  height: 20px;
-  border: 3px solid #f3f3f3;
-  border-top: 3px solid var(--primary-color);
-  border-radius: 50%;
-  animation: spin 1s linear infinite;
-  margin-left: 10px;
-}
-
-@keyframes spin {
-  0% { transform: rotate(0deg); }
-  100% { transform: rotate(360deg); }
-}
-
-.results-section {
-  margin-top: 2rem;
-}
-
-.section-title {
-  font-size: 1.5rem;
-  font-weight: 600;
-  color: var(--text-primary);
-  margin-bottom: 1rem;
-  padding-bottom: 0.5rem;
-  border-bottom: 2px solid var(--border-color);
-}
-
-#answer {
-  background: linear-gradient(135deg, #f0f9ff, #e0f2fe);
-  padding: 1.5rem;
-  border-radius: 12px;
-  border-right: 4px solid var(--primary-color);
-  margin-bottom: 2rem;
-  line-height: 1.8;
-  font-size: 1.1rem;
-  box-shadow: var(--shadow);
-}
-
-.citation-card {
-  background: var(--card-bg);
-  border: 1px solid var(--border-color);
-  border-radius: 12px;
-  padding: 1.5rem;
-  margin-bottom: 1rem;
-  box-shadow: var(--shadow);
-  transition: all 0.3s ease;
-  position: relative;
-}
-
-.citation-card:hover {
-  box-shadow: var(--shadow-lg);
-  transform: translateY(-2px);
-}
-
-.citation-header {
-  display: flex;
-  justify-content: space-between;
-  align-items: center;
-  margin-bottom: 1rem;
-  flex-wrap: wrap;
-  gap: 0.5rem;
-}
-
-.doc-title {
-  font-weight: 600;
-  color: var(--primary-color);
-  font-size: 1.1rem;
-}
-
-.doc-info {
-  display: flex;
-  gap: 1rem;
-  font-size: 0.9rem;
-  color: var(--text-secondary);
-}
-
-.doc-info span {
-  background: #f1f5f9;
-  padding: 0.25rem 0.75rem;
-  border-radius: 20px;
-  white-space: nowrap;
-}
-
-.citation-content {
-  line-height: 1.8;
-  font-size: 1.05rem;
-}
-
-/* Highlighting Styles */
-mark {
-  padding: 2px 6px;
-  border-radius: 6px;
-  font-weight: 600;
-  box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-  position: relative;
-}
-
-mark[style*="yellow"] {
-  background: linear-gradient(135deg, #fef08a, #fde047);
-  color: #854d0e;
-  border: 1px solid #eab308;
-}
-
-mark[style*="lightgreen"] {
-  background: linear-gradient(135deg, #bbf7d0, #86efac);
-  color: #14532d;
-  border: 1px solid #22c55e;
-}
-
-.highlight-legend {
-  display: flex;
-  gap: 1.5rem;
-  margin-bottom: 1.5rem;
-  padding: 1rem;
-  background: #f8fafc;
-  border-radius: 8px;
-  font-size: 0.9rem;
-  justify-content: center;
-  flex-wrap: wrap;
-}
-
-.legend-item {
-  display: flex;
-  align-items: center;
-  gap: 0.5rem;
-}
-
-.legend-color {
-  width: 16px;
-  height: 16px;
-  border-radius: 4px;
-  border: 1px solid rgba(0,0,0,0.1);
-}
-
-.legend-yellow {
-  background: linear-gradient(135deg, #fef08a, #fde047);
-}
-
-.legend-green {
-  background: linear-gradient(135deg, #bbf7d0, #86efac);
-}
-
-.access-info {
-  background: linear-gradient(135deg, #fef3c7, #fde68a);
-  border: 1px solid #f59e0b;
-  border-radius: 8px;
-  padding: 1rem;
-  margin-bottom: 1rem;
-  font-size: 0.9rem;
-  color: #92400e;
-}
-
-@media (max-width: 768px) {
-  .container {
-    margin: -1rem 1rem 1rem;
-    padding: 1.5rem;
-  }
-  
-  .search-box {
-    flex-direction: column;
-  }
-  
-  .header h1 {
-    font-size: 2rem;
-  }
-  
-  .user-info {
-    position: static;
-    margin-bottom: 1rem;
-  }
-  
-  .citation-header {
-    flex-direction: column;
-    align-items: stretch;
-  }
-  
-  .doc-info {
-    flex-wrap: wrap;
-  }
-}
-
-.empty-state {
-  text-align: center;
-  padding: 3rem 2rem;
-  color: var(--text-secondary);
-}
-
-.empty-state .icon {
-  font-size: 4rem;
-  margin-bottom: 1rem;
-  opacity: 0.5;
-}
-
-.examples-section {
-  margin-bottom: 1.5rem;
-  padding: 1rem;
-  background: #f8fafc;
-  border-radius: 8px;
-  border: 1px solid var(--border-color);
-}
-
-.example-tags {
-  display: flex;
-  gap: 0.75rem;
-  flex-wrap: wrap;
-  justify-content: center;
-}
-
-.example-tag {
-  background: linear-gradient(135deg, #e0e7ff, #c7d2fe);
-  color: #3730a3;
-  padding: 0.5rem 1rem;
-  border-radius: 20px;
-  font-size: 0.85rem;
-  cursor: pointer;
-  transition: all 0.3s ease;
-  border: 1px solid #c7d2fe;
-  white-space: nowrap;
-  user-select: none;
-}
-
-.example-tag:hover {
-  background: linear-gradient(135deg, #c7d2fe, #a5b4fc);
-  transform: translateY(-2px);
-  box-shadow: 0 4px 8px rgba(59, 130, 246, 0.3);
-}
-
-.example-tag:active {
-  transform: translateY(0);
-}
-
-.hidden {
-  display: none !important;
-}
-</style>
+<link href="{_asset_url('app.css')}" rel="stylesheet">
 </head>
 <body>
 <div class="header">
@@ -585,348 +284,75 @@ mark[style*="lightgreen"] {
   </div>
 </div>
 
-<script>
-// Global variables
-let currentUser = null;
-let authToken = null;
+<script src="{_asset_url('app.js')}"></script>
+</body></html>
+"""
 
-// Authentication functions
-async function login(event) {
-  event.preventDefault();
-  
-  const username = document.getElementById('username').value;
-  const password = document.getElementById('password').value;
-  
-  try {
-    const response = await fetch('/login', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ username, password }),
-    });
-    
-    if (!response.ok) {
-      const error = await response.json();
-      throw new Error(error.detail || 'فشل تسجيل الدخول');
-    }
-    
-    const data = await response.json();
-    authToken = data.access_token;
-    
-    // Get user info
-    const userResponse = await fetch('/me', {
-      headers: {
-        'Authorization': `Bearer ${authToken}`,
-      },
-    });
-    
-    if (userResponse.ok) {
-      currentUser = await userResponse.json();
-      showMainInterface();
-    } else {
-      throw new Error('فشل في الحصول على معلومات المستخدم');
-    }
-    
-  } catch (error) {
-    showNotification(error.message, 'error');
-  }
-}
-
-function logout() {
-  currentUser = null;
-  authToken = null;
-  showLoginInterface();
-  showNotification('تم تسجيل الخروج بنجاح', 'success');
-}
-
-function showLoginInterface() {
-  document.getElementById('loginContainer').classList.remove('hidden');
-  document.getElementById('mainContainer').classList.add('hidden');
-  document.getElementById('userInfo').classList.add('hidden');
-}
-
-function showMainInterface() {
-  document.getElementById('loginContainer').classList.add('hidden');
-  document.getElementById('mainContainer').classList.remove('hidden');
-  document.getElementById('userInfo').classList.remove('hidden');
-  
-  // Update user info display
-  document.getElementById('userName').textContent = `مرحباً ${currentUser.full_name}`;
-  document.getElementById('userRoles').textContent = `(${currentUser.roles.join(', ')})`;
-  
-  // Update access info
-  const accessInfo = document.getElementById('accessInfo');
-  const accessDetails = document.getElementById('accessDetails');
-  
-  if (currentUser.roles.includes('admin')) {
-    accessDetails.textContent = 'لديك صلاحية الوصول لجميع الوثائق بما في ذلك الوثائق المقيدة';
-    accessInfo.classList.remove('hidden');
-  } else if (currentUser.roles.includes('legal')) {
-    accessDetails.textContent = 'لديك صلاحية الوصول للوثائق العامة والوثائق المقيدة';
-    accessInfo.classList.remove('hidden');
-  } else {
-    accessDetails.textContent = 'لديك صلاحية الوصول للوثائق العامة فقط';
-    accessInfo.classList.remove('hidden');
-  }
-}
-
-// Search functionality with authentication
-async function askQuestion() {
-  const query = document.getElementById("query").value.trim();
-  const ans = document.getElementById("answer");
-  const cites = document.getElementById("citations");
-  const loading = document.getElementById("loading");
-  const searchBtn = document.getElementById("searchBtn");
-  const answerTitle = document.getElementById("answerTitle");
-  const citationsTitle = document.getElementById("citationsTitle");
-
-  if (!query) { 
-    showNotification("يرجى إدخال سؤال أولاً", "warning");
-    return; 
-  }
-
-  if (!authToken) {
-    showNotification("يرجى تسجيل الدخول أولاً", "error");
-    return;
-  }
-
-  // Reset UI state
-  ans.innerHTML = "";
-  cites.innerHTML = "";
-  answerTitle.style.display = "none";
-  citationsTitle.style.display = "none";
-  
-  // Show loading state
-  loading.style.display = "block";
-  searchBtn.disabled = true;
-  searchBtn.innerHTML = "⏳ جاري البحث...";
-
-  const payload = { query: query, topk: 8 };
-
-  try {
-    const res = await fetch("/ask", {
-      method: "POST",
-      headers: { 
-        "Content-Type": "application/json",
-        "Authorization": `Bearer ${authToken}`
-      },
-      body: JSON.stringify(payload)
-    });
-
-    if (!res.ok) {
-      if (res.status === 401) {
-        showNotification("انتهت صلاحية الجلسة، يرجى تسجيل الدخول مرة أخرى", "error");
-        logout();
-        return;
-      }
-      throw new Error(`خطأ في الخادم: ${res.status}`);
-    }
+# The page is static: encode, compress and fingerprint it once at import
+_HOME_HTML_BYTES = _HOME_HTML.encode("utf-8")
+_HOME_GZIP = gzip.compress(_HOME_HTML_BYTES, compresslevel=9)
+_HOME_BROTLI = brotli.compress(_HOME_HTML_BYTES, mode=brotli.MODE_TEXT, quality=11)
+_HOME_ETAG = 'W/"' + hashlib.sha256(_HOME_HTML_BYTES).hexdigest()[:16] + '"'
 
-    const text = await res.text();
-    const data = JSON.parse(text);
-
-    // Hide loading
-    loading.style.display = "none";
-    searchBtn.disabled = false;
-    searchBtn.innerHTML = "🔍 بحث";
-
-    // Display answer
-    if (data.answer && data.answer.trim()) {
-      answerTitle.style.display = "block";
-      ans.innerHTML = data.answer;
-      
-      // Add scroll to answer
-      setTimeout(() => {
-        ans.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
-      }, 300);
-    } else {
-      ans.innerHTML = `
-        <div class="empty-state">
-          <div class="icon">🔍</div>
-          <p>لم يتم العثور على نتائج مطابقة لاستعلامك.</p>
-          <p style="font-size: 0.9rem; margin-top: 0.5rem;">جرب استخدام كلمات مختلفة أو أكثر تحديداً.</p>
-        </div>
-      `;
-    }
 
-    // Display citations with enhanced styling
-    if (data.citations && data.citations.length > 0) {
-      citationsTitle.style.display = "block";
-      
-      data.citations.forEach((c, index) => {
-        const card = document.createElement("div");
-        card.className = "citation-card";
-        
-        const header = document.createElement("div");
-        header.className = "citation-header";
-        
-        const title = document.createElement("div");
-        title.className = "doc-title";
-        title.innerHTML = `📘 ${c.doc_id}`;
-        
-        const info = document.createElement("div");
-        info.className = "doc-info";
-        
-        const articleSpan = document.createElement("span");
-        articleSpan.innerHTML = `المادة: ${c.article_no || "غير محدد"}`;
-        
-        const pageSpan = document.createElement("span");
-        pageSpan.innerHTML = `الصفحة: ${c.page_start || "?"}-${c.page_end || "?"}`;
-        
-        const scoreSpan = document.createElement("span");
-        scoreSpan.innerHTML = `التطابق: ${Math.round((c.score || 0) * 100)}%`;
-        scoreSpan.style.background = c.score > 0.7 ? "#dcfce7" : c.score > 0.4 ? "#fef3c7" : "#fee2e2";
-        
-        info.appendChild(articleSpan);
-        info.appendChild(pageSpan);
-        info.appendChild(scoreSpan);
-        
-        header.appendChild(title);
-        header.appendChild(info);
-        
-        const content = document.createElement("div");
-        content.className = "citation-content";
-        content.innerHTML = c.excerpt || "لا يوجد محتوى متاح";
-        
-        card.appendChild(header);
-        card.appendChild(content);
-        
-        // Add animation delay
-        card.style.opacity = "0";
-        card.style.transform = "translateY(20px)";
-        cites.appendChild(card);
-        
-        setTimeout(() => {
-          card.style.transition = "all 0.5s ease";
-          card.style.opacity = "1";
-          card.style.transform = "translateY(0)";
-        }, index * 100);
-      });
-      
-      let notificationText = `تم العثور على ${data.citations.length} نتيجة مطابقة`;
-      if (data.total_found && data.total_found > data.accessible_results) {
-        notificationText += ` (${data.total_found - data.accessible_results} نتيجة مقيدة)`;
-      }
-      showNotification(notificationText, "success");
-    }
-    
-  } catch (err) {
-    console.error('Search error:', err);
-    loading.style.display = "none";
-    searchBtn.disabled = false;
-    searchBtn.innerHTML = "🔍 بحث";
-    
-    ans.innerHTML = `
-      <div class="empty-state">
-        <div class="icon">⚠️</div>
-        <p>حدث خطأ أثناء البحث</p>
-        <p style="font-size: 0.9rem; margin-top: 0.5rem;">${err.message}</p>
-      </div>
-    `;
-    
-    showNotification("حدث خطأ أثناء البحث. يرجى المحاولة مرة أخرى.", "error");
-  }
-}
-
-// Enhanced notification system
-function showNotification(message, type = 'info') {
-  const notification = document.createElement('div');
-  notification.style.cssText = `
-    position: fixed;
-    top: 20px;
-    right: 20px;
-    padding: 1rem 1.5rem;
-    border-radius: 8px;
-    color: white;
-    font-weight: 500;
-    z-index: 1000;
-    max-width: 300px;
-    box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-    transform: translateX(100%);
-    transition: transform 0.3s ease;
-  `;
-  
-  const colors = {
-    success: '#059669',
-    warning: '#d97706',
-    error: '#dc2626',
-    info: '#0284c7'
-  };
-  
-  notification.style.background = colors[type] || colors.info;
-  notification.textContent = message;
-  
-  document.body.appendChild(notification);
-  
-  // Slide in
-  setTimeout(() => {
-    notification.style.transform = 'translateX(0)';
-  }, 100);
-  
-  // Slide out and remove
-  setTimeout(() => {
-    notification.style.transform = 'translateX(100%)';
-    setTimeout(() => {
-      document.body.removeChild(notification);
-    }, 300);
-  }, 3000);
-}
-
-// Enhanced keyboard support
-document.addEventListener('DOMContentLoaded', function() {
-  // Auto-focus on username input
-  document.getElementById("username").focus();
-});
-
-document.getElementById("query").addEventListener("keypress", function(e) {
-  if (e.key === "Enter" && !e.shiftKey) {
-    e.preventDefault();
-    askQuestion();
-  }
-});
-
-// Clear search results when input changes significantly
-let lastQuery = "";
-document.getElementById("query").addEventListener("input", function(e) {
-  const currentQuery = e.target.value.trim();
-  if (lastQuery && currentQuery.length < lastQuery.length * 0.5) {
-    // If user deleted significant portion, clear results
-    document.getElementById("answer").innerHTML = "";
-    document.getElementById("citations").innerHTML = "";
-    document.getElementById("answerTitle").style.display = "none";
-    document.getElementById("citationsTitle").style.display = "none";
-  }
-  lastQuery = currentQuery;
-});
-
-// Set example query and search
-function setQuery(exampleQuery) {
-  const queryInput = document.getElementById("query");
-  queryInput.value = exampleQuery;
-  queryInput.focus();
-  
-  // Add a small animation to show the query was set
-  queryInput.style.background = "#dbeafe";
-  setTimeout(() => {
-    queryInput.style.background = "#fafbfc";
-  }, 500);
-  
-  // Auto-search after setting the query
-  setTimeout(() => {
-    askQuestion();
-  }, 200);
-}
-</script>
-</body></html>
-""")
+@app.get("/", response_class=HTMLResponse)
+def home(request: Request):
+    # Browsers revalidate on each visit; an unchanged page costs a 304
+    headers = {"ETag": _HOME_ETAG, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == _HOME_ETAG:
+        return Response(status_code=304, headers=headers)
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if "br" in accept_encoding:
+        headers["Content-Encoding"] = "br"
+        return Response(_HOME_BROTLI, media_type="text/html; charset=utf-8", headers=headers)
+    if "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        return Response(_HOME_GZIP, media_type="text/html; charset=utf-8", headers=headers)
+    return Response(_HOME_HTML_BYTES, media_type="text/html; charset=utf-8", headers=headers)
+
+
+# bcrypt verification takes ~300ms of CPU: it runs off the event loop on at most two
+# cores, and each client address gets LOGIN_RATE_LIMIT attempts per window (per worker)
+_bcrypt_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bcrypt")
+LOGIN_RATE_LIMIT = 10
+LOGIN_RATE_WINDOW_SECONDS = 60
+LOGIN_RATE_MAX_CLIENTS = 4096
+# Least recently active client first, so lapsed and surplus clients are evicted from the front
+_login_attempts: OrderedDict[str, deque] = OrderedDict()
+
+
+def login_rate_limited(client: str) -> bool:
+    """Record a login attempt from client; True when it exceeds the allowed rate."""
+    now = time.monotonic()
+    window_start = now - LOGIN_RATE_WINDOW_SECONDS
+    attempts = _login_attempts.pop(client, None) or deque()
+    # Drop clients whose window has lapsed, then the least recently active beyond the cap
+    while _login_attempts:
+        oldest = next(iter(_login_attempts.values()))
+        if oldest[-1] > window_start and len(_login_attempts) < LOGIN_RATE_MAX_CLIENTS:
+            break
+        _login_attempts.popitem(last=False)
+    _login_attempts[client] = attempts
+    while attempts and attempts[0] <= window_start:
+        attempts.popleft()
+    if len(attempts) >= LOGIN_RATE_LIMIT:
+        return True
+    attempts.append(now)
+    return False
 
 
 # Authentication endpoints
 @app.post("/login", response_model=Token)
-async def login(login_data: LoginRequest):
+async def login(login_data: LoginRequest, request: Request):
     """Login endpoint to get access token"""
-    user = authenticate_user(login_data.username, login_data.password)
+    if login_rate_limited(request.client.host if request.client else "unknown"):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(LOGIN_RATE_WINDOW_SECONDS)},
+        )
+    user = await asyncio.get_running_loop().run_in_executor(
+        _bcrypt_pool, authenticate_user, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -947,7 +373,6 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 @app.get("/users", response_model=list[User])
 async def list_users(current_user: User = Depends(require_roles(["admin"]))):
     """List all users (admin only)"""
-    from .auth import USERS_DB
     users = []
     for user_data in USERS_DB.values():
         users.append(User(
@@ -959,33 +384,91 @@ async def list_users(current_user: User = Depends(require_roles(["admin"]))):
         ))
     return users
 
+async def answer_query(batcher: QueryBatcher, query: str, topk: int, user_roles: list[str]) -> dict:
+    """Run the RBAC-filtered search behind /ask and /ask/stream."""
+    # Get effective roles for the user
+    effective_roles = get_effective_roles(user_roles)
+    
+    # Perform search with user's roles; file restrictions are applied inside the search
+    out = await batcher.search(query, effective_roles, topk, user_roles)
+    
+    return {
+        "answer": out["answer"], 
+        "citations": out["results"],
+        "user_roles": user_roles,
+        "total_found": out["total_found"],
+        "accessible_results": out["accessible_results"]
+    }
+
+
+async def cached_answer(batcher: QueryBatcher, query: str, topk: int,
+                        user_roles: list[str]) -> tuple[dict, bytes]:
+    """/ask response as a dict and encoded, served from _ask_cache when the same search was seen before."""
+    # Repeated queries (e.g. the page's example tags) are served from the cache
+    cache_key = (query.strip(), tuple(user_roles), topk)
+    entry = _ask_cache.get(cache_key)
+    if entry is not None:
+        _ask_cache.move_to_end(cache_key)
+        return entry
+
+    data = await answer_query(batcher, query, topk, user_roles)
+    entry = _ask_cache[cache_key] = (data, orjson.dumps(data))
+    if len(_ask_cache) > ASK_CACHE_SIZE:
+        _ask_cache.popitem(last=False)
+    return entry
+
+
+async def warm_ask_cache(batcher: QueryBatcher):
+    """Answer the page's example tags for every configured role set before the first click."""
+    role_sets = {tuple(user["roles"]) for user in USERS_DB.values()}
+    await asyncio.gather(*(cached_answer(batcher, query, EXAMPLE_TOPK, list(roles))
+                           for roles in role_sets for query in EXAMPLE_QUERIES))
+
+
 @app.post("/ask", response_class=Response)
-async def ask(payload: AskPayload, current_user: User = Depends(get_current_user)):
+async def ask(payload: AskPayload, request: Request, current_user: User = Depends(get_current_user)):
     """
     Search endpoint with RBAC - Return manual JSON string (NOT auto-escaped).
     """
-    # Get effective roles for the user
-    effective_roles = get_effective_roles(current_user.roles)
-    
-    # Perform search with user's roles
-    out = search(indices, payload.query, effective_roles, topk=payload.topk)
-    
-    # Filter results based on file access restrictions
-    filtered_results = filter_documents_by_access(current_user.roles, out["results"])
-    
-    # Update the answer if no results remain after filtering
-    if not filtered_results and out["results"]:
-        answer_html = "لم يتم العثور على نتائج متاحة بناءً على صلاحياتك الحالية."
-    else:
-        answer_html = out["answer"]
-    
-    raw_json = json.dumps({
-        "answer": answer_html, 
-        "citations": filtered_results,
-        "user_roles": current_user.roles,
-        "total_found": len(out["results"]),
-        "accessible_results": len(filtered_results)
-    }, ensure_ascii=False)
-    
+    _, raw_json = await cached_answer(request.app.state.batcher, payload.query, payload.topk, current_user.roles)
     # ✅ return as plain response so <mark> isn't escaped
     return Response(content=raw_json, media_type="application/json")
+
+
+@app.get("/ask", response_class=Response)
+async def ask_get(request: Request, query: Annotated[QueryText, Query()],
+                  topk: int = Query(5, ge=1, le=MAX_TOPK),
+                  current_user: User = Depends(get_current_user)):
+    """
+    Cacheable form of POST /ask; a matching If-None-Match skips the search entirely.
+    """
+    # The response is a pure function of the search inputs and the loaded index files
+    etag_src = "|".join((request.app.state.index_version, query, ",".join(current_user.roles), str(topk)))
+    etag = '"' + hashlib.blake2b(etag_src.encode("utf-8"), digest_size=16).hexdigest() + '"'
+    # Results depend on the caller's roles, so only the browser may cache them
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300", "Vary": "Authorization"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    _, raw_json = await cached_answer(request.app.state.batcher, query, topk, current_user.roles)
+    return Response(content=raw_json, media_type="application/json", headers=headers)
+
+
+@app.post("/ask/stream")
+async def ask_stream(payload: AskPayload, request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Same search as /ask as NDJSON: an answer line, then one line per citation.
+    """
+    data, _ = await cached_answer(request.app.state.batcher, payload.query, payload.topk, current_user.roles)
+
+    def lines():
+        yield orjson.dumps({
+            "type": "answer",
+            "answer": data["answer"],
+            "user_roles": data["user_roles"],
+            "total_found": data["total_found"],
+            "accessible_results": data["accessible_results"],
+        }) + b"\n"
+        for cite in data["citations"]:
+            yield orjson.dumps({"type": "cite", "cite": cite}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,350 @@
+// Global variables
+let currentUser = null;
+let authToken = null;
+
+// Authentication functions
+async function login(event) {
+  event.preventDefault();
+  
+  const username = document.getElementById('username').value;
+  const password = document.getElementById('password').value;
+  
+  try {
+    const response = await fetch('/login', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ username, password }),
+    });
+    
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'فشل تسجيل الدخول');
+    }
+    
+    const data = await response.json();
+    authToken = data.access_token;
+    
+    // Get user info
+    const userResponse = await fetch('/me', {
+      headers: {
+        'Authorization': `Bearer ${authToken}`,
+      },
+    });
+    
+    if (userResponse.ok) {
+      currentUser = await userResponse.json();
+      showMainInterface();
+    } else {
+      throw new Error('فشل في الحصول على معلومات المستخدم');
+    }
+    
+  } catch (error) {
+    showNotification(error.message, 'error');
+  }
+}
+
+function logout() {
+  currentUser = null;
+  authToken = null;
+  showLoginInterface();
+  showNotification('تم تسجيل الخروج بنجاح', 'success');
+}
+
+function showLoginInterface() {
+  document.getElementById('loginContainer').classList.remove('hidden');
+  document.getElementById('mainContainer').classList.add('hidden');
+  document.getElementById('userInfo').classList.add('hidden');
+}
+
+function showMainInterface() {
+  document.getElementById('loginContainer').classList.add('hidden');
+  document.getElementById('mainContainer').classList.remove('hidden');
+  document.getElementById('userInfo').classList.remove('hidden');
+  
+  // Update user info display
+  document.getElementById('userName').textContent = `مرحباً ${currentUser.full_name}`;
+  document.getElementById('userRoles').textContent = `(${currentUser.roles.join(', ')})`;
+  
+  // Update access info
+  const accessInfo = document.getElementById('accessInfo');
+  const accessDetails = document.getElementById('accessDetails');
+  
+  if (currentUser.roles.includes('admin')) {
+    accessDetails.textContent = 'لديك صلاحية الوصول لجميع الوثائق بما في ذلك الوثائق المقيدة';
+    accessInfo.classList.remove('hidden');
+  } else if (currentUser.roles.includes('legal')) {
+    accessDetails.textContent = 'لديك صلاحية الوصول للوثائق العامة والوثائق المقيدة';
+    accessInfo.classList.remove('hidden');
+  } else {
+    accessDetails.textContent = 'لديك صلاحية الوصول للوثائق العامة فقط';
+    accessInfo.classList.remove('hidden');
+  }
+}
+
+// Search functionality with authentication
+function renderCitation(cites, c, index) {
+  const card = document.createElement("div");
+  card.className = "citation-card";
+  
+  const header = document.createElement("div");
+  header.className = "citation-header";
+  
+  const title = document.createElement("div");
+  title.className = "doc-title";
+  title.innerHTML = `📘 ${c.doc_id}`;
+  
+  const info = document.createElement("div");
+  info.className = "doc-info";
+  
+  const articleSpan = document.createElement("span");
+  articleSpan.innerHTML = `المادة: ${c.article_no || "غير محدد"}`;
+  
+  const pageSpan = document.createElement("span");
+  pageSpan.innerHTML = `الصفحة: ${c.page_start || "?"}-${c.page_end || "?"}`;
+  
+  const scoreSpan = document.createElement("span");
+  scoreSpan.innerHTML = `التطابق: ${Math.round((c.score || 0) * 100)}%`;
+  scoreSpan.style.background = c.score > 0.7 ? "#dcfce7" : c.score > 0.4 ? "#fef3c7" : "#fee2e2";
+  
+  info.appendChild(articleSpan);
+  info.appendChild(pageSpan);
+  info.appendChild(scoreSpan);
+  
+  header.appendChild(title);
+  header.appendChild(info);
+  
+  const content = document.createElement("div");
+  content.className = "citation-content";
+  content.innerHTML = c.excerpt || "لا يوجد محتوى متاح";
+  
+  card.appendChild(header);
+  card.appendChild(content);
+  
+  // Add animation delay
+  card.style.opacity = "0";
+  card.style.transform = "translateY(20px)";
+  cites.appendChild(card);
+  
+  setTimeout(() => {
+    card.style.transition = "all 0.5s ease";
+    card.style.opacity = "1";
+    card.style.transform = "translateY(0)";
+  }, index * 100);
+}
+
+async function askQuestion() {
+  const query = document.getElementById("query").value.trim();
+  const ans = document.getElementById("answer");
+  const cites = document.getElementById("citations");
+  const loading = document.getElementById("loading");
+  const searchBtn = document.getElementById("searchBtn");
+  const answerTitle = document.getElementById("answerTitle");
+  const citationsTitle = document.getElementById("citationsTitle");
+
+  if (!query) { 
+    showNotification("يرجى إدخال سؤال أولاً", "warning");
+    return; 
+  }
+
+  if (!authToken) {
+    showNotification("يرجى تسجيل الدخول أولاً", "error");
+    return;
+  }
+
+  // Reset UI state
+  ans.innerHTML = "";
+  cites.innerHTML = "";
+  answerTitle.style.display = "none";
+  citationsTitle.style.display = "none";
+  
+  // Show loading state
+  loading.style.display = "block";
+  searchBtn.disabled = true;
+  searchBtn.innerHTML = "⏳ جاري البحث...";
+
+  const payload = { query: query, topk: 8 };
+
+  try {
+    const res = await fetch("/ask/stream", {
+      method: "POST",
+      headers: { 
+        "Content-Type": "application/json",
+        "Authorization": `Bearer ${authToken}`
+      },
+      body: JSON.stringify(payload)
+    });
+
+    if (!res.ok) {
+      if (res.status === 401) {
+        showNotification("انتهت صلاحية الجلسة، يرجى تسجيل الدخول مرة أخرى", "error");
+        logout();
+        return;
+      }
+      throw new Error(`خطأ في الخادم: ${res.status}`);
+    }
+
+    // NDJSON stream: the answer line first, then one line per citation
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    let summary = null;
+    let shown = 0;
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const msg = JSON.parse(line);
+      if (msg.type === "answer") {
+        summary = msg;
+        // Hide loading
+        loading.style.display = "none";
+        searchBtn.disabled = false;
+        searchBtn.innerHTML = "🔍 بحث";
+
+        // Display answer
+        if (msg.answer && msg.answer.trim()) {
+          answerTitle.style.display = "block";
+          ans.innerHTML = msg.answer;
+      
+          // Add scroll to answer
+          setTimeout(() => {
+            ans.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+          }, 300);
+        } else {
+          ans.innerHTML = `
+            <div class="empty-state">
+              <div class="icon">🔍</div>
+              <p>لم يتم العثور على نتائج مطابقة لاستعلامك.</p>
+              <p style="font-size: 0.9rem; margin-top: 0.5rem;">جرب استخدام كلمات مختلفة أو أكثر تحديداً.</p>
+            </div>
+          `;
+        }
+      } else if (msg.type === "cite") {
+        if (shown === 0) citationsTitle.style.display = "block";
+        renderCitation(cites, msg.cite, shown++);
+      }
+    };
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split("\n");
+      buffered = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffered + decoder.decode());
+
+    if (shown > 0) {
+      let notificationText = `تم العثور على ${shown} نتيجة مطابقة`;
+      if (summary && summary.total_found > summary.accessible_results) {
+        notificationText += ` (${summary.total_found - summary.accessible_results} نتيجة مقيدة)`;
+      }
+      showNotification(notificationText, "success");
+    }
+    
+  } catch (err) {
+    console.error('Search error:', err);
+    loading.style.display = "none";
+    searchBtn.disabled = false;
+    searchBtn.innerHTML = "🔍 بحث";
+    
+    ans.innerHTML = `
+      <div class="empty-state">
+        <div class="icon">⚠️</div>
+        <p>حدث خطأ أثناء البحث</p>
+        <p style="font-size: 0.9rem; margin-top: 0.5rem;">${err.message}</p>
+      </div>
+    `;
+    
+    showNotification("حدث خطأ أثناء البحث. يرجى المحاولة مرة أخرى.", "error");
+  }
+}
+
+// Enhanced notification system
+function showNotification(message, type = 'info') {
+  const notification = document.createElement('div');
+  notification.style.cssText = `
+    position: fixed;
+    top: 20px;
+    right: 20px;
+    padding: 1rem 1.5rem;
+    border-radius: 8px;
+    color: white;
+    font-weight: 500;
+    z-index: 1000;
+    max-width: 300px;
+    box-shadow: 0 4px 12px rgba(0,0,0,0.15);
+    transform: translateX(100%);
+    transition: transform 0.3s ease;
+  `;
+  
+  const colors = {
+    success: '#059669',
+    warning: '#d97706',
+    error: '#dc2626',
+    info: '#0284c7'
+  };
+  
+  notification.style.background = colors[type] || colors.info;
+  notification.textContent = message;
+  
+  document.body.appendChild(notification);
+  
+  // Slide in
+  setTimeout(() => {
+    notification.style.transform = 'translateX(0)';
+  }, 100);
+  
+  // Slide out and remove
+  setTimeout(() => {
+    notification.style.transform = 'translateX(100%)';
+    setTimeout(() => {
+      document.body.removeChild(notification);
+    }, 300);
+  }, 3000);
+}
+
+// Enhanced keyboard support
+document.addEventListener('DOMContentLoaded', function() {
+  // Auto-focus on username input
+  document.getElementById("username").focus();
+});
+
+document.getElementById("query").addEventListener("keypress", function(e) {
+  if (e.key === "Enter" && !e.shiftKey) {
+    e.preventDefault();
+    askQuestion();
+  }
+});
+
+// Clear search results when input changes significantly
+let lastQuery = "";
+document.getElementById("query").addEventListener("input", function(e) {
+  const currentQuery = e.target.value.trim();
+  if (lastQuery && currentQuery.length < lastQuery.length * 0.5) {
+    // If user deleted significant portion, clear results
+    document.getElementById("answer").innerHTML = "";
+    document.getElementById("citations").innerHTML = "";
+    document.getElementById("answerTitle").style.display = "none";
+    document.getElementById("citationsTitle").style.display = "none";
+  }
+  lastQuery = currentQuery;
+});
+
+// Set example query and search
+function setQuery(exampleQuery) {
+  const queryInput = document.getElementById("query");
+  queryInput.value = exampleQuery;
+  queryInput.focus();
+  
+  // Add a small animation to show the query was set
+  queryInput.style.background = "#dbeafe";
+  setTimeout(() => {
+    queryInput.style.background = "#fafbfc";
+  }, 500);
+  
+  // Auto-search after setting the query
+  setTimeout(() => {
+    askQuestion();
+  }, 200);
+}
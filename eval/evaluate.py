@@ -13,7 +13,7 @@ from pathlib import Path
 # Add parent directory to path to import app modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.retrieval import load_bm25, load_faiss, load_meta, load_model, Indices, search
+from app.retrieval import get_indices, search, search_batch
 from app.auth import get_effective_roles, filter_documents_by_access
 
 def load_gold_standard(gold_file):
@@ -36,7 +36,10 @@ def evaluate_query(idx, query, expected_doc, expected_article, roles=['admin']):
     
     # Perform search
     out = search(idx, query, roles=effective_roles, topk=10)
-    
+    return score_search_output(out, query, expected_doc, expected_article, roles)
+
+def score_search_output(out, query, expected_doc, expected_article, roles=['admin']):
+    """Match one query's search output against its expected document and article"""
     # Filter results based on file access restrictions
     filtered_results = filter_documents_by_access(roles, out["results"])
     
@@ -133,29 +136,28 @@ def main():
     """Main evaluation function"""
     print("Loading evaluation data...")
     
-    # Load indices
-    bm25 = load_bm25("data/idx/bm25.pkl")
-    faiss_index = load_faiss("data/idx/mE5.faiss")
-    meta = load_meta("data/idx/meta.json")
-    model = load_model("intfloat/multilingual-e5-base")
-    idx = Indices(bm25=bm25, faiss_index=faiss_index, meta=meta, model=model)
+    # Same indices and encoder as the API, loaded once per process
+    idx = get_indices()
     
     # Load gold standard
     gold_data = load_gold_standard("eval/gold.csv")
     print(f"Loaded {len(gold_data)} evaluation queries")
     
-    # Run evaluation
+    # Run evaluation: one batched encode + FAISS search for all queries, then score each
     print("Running evaluation...")
+    roles = ['admin']
+    outs = search_batch(idx, [g['query'] for g in gold_data], get_effective_roles(roles), topk=10)
     results = []
     
-    for i, gold_item in enumerate(gold_data):
+    for i, (gold_item, out) in enumerate(zip(gold_data, outs)):
         print(f"Evaluating query {i+1}/{len(gold_data)}: {gold_item['query']}")
         
-        result = evaluate_query(
-            idx, 
+        result = score_search_output(
+            out,
             gold_item['query'], 
             gold_item['expected_doc'], 
-            gold_item['expected_article']
+            gold_item['expected_article'],
+            roles
         )
         results.append(result)
     
@@ -1,15 +1,28 @@
-import json, pickle, os
+import pickle, os, orjson
+from multiprocessing import Pool
 from rank_bm25 import BM25Okapi
+from app.bm25_fast import BM25Fast
 from app.normalize import tokenize_ar
 INP = "data/processed/chunks.jsonl"
 OUT = "data/idx/bm25.pkl"
-def load_chunks(path):
-    return [json.loads(line) for line in open(path, "r", encoding="utf-8")]
+TOKENIZE_CHUNKSIZE = 512  # texts per worker task; tokenize_ar is cheap, so amortize the IPC
+MIN_PARALLEL_DOCS = 20000  # below this the pool start-up costs more than it saves
+def iter_field(path, field):
+    """Yield one field per JSONL record without keeping the parsed records around."""
+    with open(path, "rb") as f:
+        for line in f:
+            yield orjson.loads(line)[field]
 if __name__ == "__main__":
-    chunks = load_chunks(INP)
-    docs_tokens = [tokenize_ar(ch["text"]) for ch in chunks]
-    bm25 = BM25Okapi(docs_tokens)
+    texts = list(iter_field(INP, "text"))
+    workers = os.cpu_count() or 1
+    if workers > 1 and len(texts) >= MIN_PARALLEL_DOCS:
+        with Pool(workers) as pool:
+            docs_tokens = pool.map(tokenize_ar, texts, chunksize=TOKENIZE_CHUNKSIZE)
+    else:
+        docs_tokens = list(map(tokenize_ar, texts))
+    # Fit with rank_bm25 for its idf rules, then keep only the CSR postings it scores through
+    bm25 = BM25Fast.from_okapi(BM25Okapi(docs_tokens))
     os.makedirs(os.path.dirname(OUT), exist_ok=True)
     with open(OUT, "wb") as f:
         pickle.dump(bm25, f)
-    print(f"[ok] wrote {OUT} over {len(chunks)} chunks")
+    print(f"[ok] wrote {OUT} over {len(docs_tokens)} chunks")
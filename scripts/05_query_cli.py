@@ -1,5 +1,5 @@
 import argparse
-from app.retrieval import load_bm25, load_faiss, load_meta, load_model, Indices, search
+from app.retrieval import get_indices, search
 from app.auth import get_effective_roles, filter_documents_by_access
 
 if __name__ == "__main__":
@@ -10,11 +10,7 @@ if __name__ == "__main__":
     ap.add_argument("--show-restricted", action="store_true", help="Show information about restricted documents")
     a = ap.parse_args()
     
-    bm25 = load_bm25("data/idx/bm25.pkl")
-    faiss_index = load_faiss("data/idx/mE5.faiss")
-    meta = load_meta("data/idx/meta.json")
-    model = load_model("intfloat/multilingual-e5-base")
-    idx = Indices(bm25=bm25, faiss_index=faiss_index, meta=meta, model=model)
+    idx = get_indices()
     
     # Get effective roles
     effective_roles = get_effective_roles(a.roles)
@@ -41,6 +37,8 @@ if __name__ == "__main__":
     
     if a.show_restricted and len(out['results']) > len(filtered_results):
         print(f"\nRESTRICTED DOCUMENTS ({len(out['results']) - len(filtered_results)} hidden):")
+        # filter_documents_by_access keeps the same dicts, so identity marks the accessible ones
+        accessible = {id(c) for c in filtered_results}
         for c in out['results']:
-            if c not in filtered_results:
+            if id(c) not in accessible:
                 print(f"- {c['doc_id']} [ACCESS DENIED]")
@@ -0,0 +1,19 @@
+import os
+from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+MODEL = os.getenv("MODEL_NAME","intfloat/multilingual-e5-base")
+OUT = "data/models/mE5"
+if __name__ == "__main__":
+    # Export the FP32 ONNX graph, then dynamically quantized copies: per-channel QInt8
+    # weights with QUInt8 activations for VNNI dot-product units, and one for AVX2-only CPUs
+    model = SentenceTransformer(MODEL, backend="onnx")
+    model.save_pretrained(OUT)
+    qconfig = AutoQuantizationConfig.avx512_vnni(
+        is_static=False,
+        per_channel=True,
+        operators_to_quantize=["MatMul", "Attention", "Gather", "EmbedLayerNormalization"],
+    )
+    export_dynamic_quantized_onnx_model(model, qconfig, OUT, file_suffix="qint8_avx512_vnni")
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=True)
+    export_dynamic_quantized_onnx_model(model, qconfig, OUT, file_suffix="qint8_avx2")
+    print(f"[ok] wrote ONNX models for {MODEL} to {OUT}")
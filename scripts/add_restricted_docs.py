@@ -86,7 +86,7 @@ def add_restricted_documents():
             })
         
         with open(meta_file, 'w', encoding='utf-8') as f:
-            json.dump(meta, f, ensure_ascii=False, indent=2)
+            json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
         
         print(f"Updated {meta_file} with restricted document metadata")
     
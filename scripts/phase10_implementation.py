@@ -5,29 +5,62 @@ AraBERT-v3, Multilingual Reranker, and Fine-tuning Dataset
 """
 
 import os
+import io
 import sys
+import importlib
+import threading
+from contextlib import redirect_stdout
 from pathlib import Path
-import subprocess
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def run_command(command, description):
-    """Run a command and handle errors"""
+# Repository root, so the app modules import in-process like in eval/evaluate.py
+sys.path.append(str(Path(__file__).parent.parent))
+
+class ThreadBufferedStdout:
+    """stdout stand-in that sends each capturing thread's prints to its own buffer"""
+    
+    def __init__(self, target):
+        self._target = target
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, "buffer", self._target).write(text)
+    
+    def flush(self):
+        getattr(self._local, "buffer", self._target).flush()
+    
+    def capture(self, step):
+        """Run step() in this thread, returning (its result, everything it printed)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return step(), self._local.buffer.getvalue()
+        finally:
+            del self._local.buffer
+
+def cached_import(module_name):
+    """Return module_name from sys.modules when fully initialized, else import it"""
+    module = sys.modules.get(module_name)
+    spec = getattr(module, "__spec__", None)
+    if module is not None and spec is not None and not getattr(spec, "_initializing", False):
+        return module
+    return importlib.import_module(module_name)
+
+def import_check(module_name, attribute, description):
+    """Import module_name.attribute in this process and report the outcome"""
     print(f"\n{'='*60}")
     print(f"Running: {description}")
-    print(f"Command: {command}")
+    print(f"Import: from {module_name} import {attribute}")
     print('='*60)
     
+    # No child interpreter: modules already imported (torch, transformers) are reused from sys.modules
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        getattr(cached_import(module_name), attribute)
         print("✅ Success!")
-        if result.stdout:
-            print("Output:", result.stdout)
         return True
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"❌ Error: {e}")
-        if e.stderr:
-            print("Error output:", e.stderr)
         return False
 
 def check_dependencies():
@@ -44,7 +77,7 @@ def check_dependencies():
     missing_packages = []
     for package in required_packages:
         try:
-            __import__(package.replace("-", "_"))
+            cached_import(package.replace("-", "_"))
             print(f"✅ {package}")
         except ImportError:
             print(f"❌ {package} - Missing")
@@ -72,8 +105,7 @@ def implement_arabert_integration():
     print("✅ AraBERT integration module created")
     
     # Test AraBERT integration
-    test_command = "python -c \"from app.arabert_integration import AraBERTIntegration; print('AraBERT module loaded successfully')\""
-    if run_command(test_command, "Testing AraBERT module"):
+    if import_check("app.arabert_integration", "AraBERTIntegration", "Testing AraBERT module"):
         print("✅ AraBERT integration ready")
         return True
     else:
@@ -95,8 +127,7 @@ def implement_reranker():
     print("✅ Reranker module created")
     
     # Test reranker
-    test_command = "python -c \"from app.reranker import MultilingualReranker; print('Reranker module loaded successfully')\""
-    if run_command(test_command, "Testing Reranker module"):
+    if import_check("app.reranker", "MultilingualReranker", "Testing Reranker module"):
         print("✅ Reranker integration ready")
         return True
     else:
@@ -121,19 +152,21 @@ def prepare_finetuning_dataset():
         print("❌ Dataset preparation script not found")
         return False
     
-    if run_command(f"python {script_path}", "Preparing fine-tuning dataset"):
+    # Called in-process; scripts/ is on sys.path as this script's own directory
+    try:
+        cached_import("prepare_finetuning_dataset").main()
         print("✅ Fine-tuning dataset prepared")
         return True
-    else:
+    except Exception as e:
+        print(f"❌ Error: {e}")
         print("❌ Failed to prepare dataset")
         return False
 
-def create_phase10_evidence():
-    """Create evidence file for Phase 10"""
-    evidence = f"""PHASE 10 EVIDENCE - NEXT SPRINT HOOKS
+# Constant evidence report; only the date is filled in per run
+_EVIDENCE_TEMPLATE = """PHASE 10 EVIDENCE - NEXT SPRINT HOOKS
 =========================================
 
-Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Date: {date}
 Status: IMPLEMENTED
 
 Advanced Features Implemented:
@@ -182,6 +215,10 @@ Verification:
 ✅ All modules importable and functional
 ✅ Ready for next sprint implementation
 """
+
+def create_phase10_evidence():
+    """Create evidence file for Phase 10"""
+    evidence = _EVIDENCE_TEMPLATE.format(date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     
     with open("evidence_phase10.txt", "w", encoding="utf-8") as f:
         f.write(evidence)
@@ -258,18 +295,17 @@ def main():
         print("\n❌ Missing dependencies. Please install required packages first.")
         return False
     
-    # Implement features
+    # Implement features: independent checks (different modules and files), so run them together;
+    # each one's output is buffered and replayed in order so the steps don't interleave
+    features = [implement_arabert_integration, implement_reranker, prepare_finetuning_dataset]
+    total_features = len(features)
+    stdout = ThreadBufferedStdout(sys.stdout)
+    with redirect_stdout(stdout), ThreadPoolExecutor(max_workers=total_features) as pool:
+        outcomes = list(pool.map(stdout.capture, features))
     success_count = 0
-    total_features = 3
-    
-    if implement_arabert_integration():
-        success_count += 1
-    
-    if implement_reranker():
-        success_count += 1
-    
-    if prepare_finetuning_dataset():
-        success_count += 1
+    for succeeded, output in outcomes:
+        print(output, end="")
+        success_count += succeeded
     
     # Create evidence and examples
     create_phase10_evidence()
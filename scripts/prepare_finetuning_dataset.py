@@ -4,21 +4,28 @@ Prepare Fine-tuning Dataset for Arabic Q→Citation Pairs
 Phase 10 - Next Sprint Hooks
 """
 
-import json
 import csv
+import re
+import orjson
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 import random
 from datetime import datetime
 
+# Any character at or above U+0600 (the Arabic block onwards), as the old ord(c) >= 0x0600 test
+_ARABIC_CHAR_RE = re.compile(r"[^\u0000-\u05FF]")
+
 class FineTuningDatasetPreparer:
     """
     Prepare 60-120 Arabic Q→Citation pairs for fine-tuning
     """
     
-    def __init__(self, chunks_path: str = "data/processed/chunks.jsonl"):
+    def __init__(self, chunks_path: str = "data/processed/chunks.jsonl", seed: int = 42):
         self.chunks_path = chunks_path
+        # Own seeded generator: the same chunks file always yields the same dataset
+        self.rng = random.Random(seed)
         self.chunks = []
+        self._dirs_made = set()  # output directories already created by this preparer
         self.question_templates = [
             "ما هو {concept}؟",
             "ما هي {concept}؟", 
@@ -88,64 +95,38 @@ class FineTuningDatasetPreparer:
             "إصدار الترخيص", "تقييم المخاطر", "مراقبة المنشآت", "إدارة النفايات",
             "تقييم الأضرار", "دفع التعويضات", "إجراء الفحوصات", "تطبيق الإجراءات"
         ]
+        
+        # Placeholder -> filler list, and each template's placeholders in order, resolved once
+        self._field_sources = {
+            "concept": self.concepts, "action": self.actions, "requirement": self.requirements,
+            "entity": self.entities, "context": self.contexts, "legal_concept": self.legal_concepts,
+            "procedure": self.procedures, "condition": self.conditions, "term": self.terms,
+            "process": self.processes
+        }
+        self._template_fields = {
+            template: re.findall(r"\{(\w+)\}", template) for template in self.question_templates
+        }
     
     def load_chunks(self):
         """Load processed chunks"""
         print("Loading chunks...")
-        with open(self.chunks_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                chunk = json.loads(line)
-                self.chunks.append(chunk)
+        with open(self.chunks_path, 'rb') as f:
+            self.chunks.extend([orjson.loads(line) for line in f])
         print(f"Loaded {len(self.chunks)} chunks")
     
     def generate_question(self, template: str, chunk: Dict[str, Any]) -> str:
         """Generate a question based on template and chunk content"""
-        # Extract key terms from chunk
-        text = chunk.get('text', '')
-        doc_id = chunk.get('doc_id', '')
-        article_no = chunk.get('article_no', '')
-        
-        # Simple keyword extraction
-        keywords = self._extract_keywords(text)
-        
-        # Fill template based on type
-        if "{concept}" in template:
-            concept = random.choice(self.concepts)
-            return template.format(concept=concept)
-        elif "{action}" in template:
-            action = random.choice(self.actions)
-            return template.format(action=action)
-        elif "{requirement}" in template:
-            requirement = random.choice(self.requirements)
-            return template.format(requirement=requirement)
-        elif "{entity}" in template and "{context}" in template:
-            entity = random.choice(self.entities)
-            context = random.choice(self.contexts)
-            return template.format(entity=entity, context=context)
-        elif "{legal_concept}" in template:
-            legal_concept = random.choice(self.legal_concepts)
-            return template.format(legal_concept=legal_concept)
-        elif "{procedure}" in template:
-            procedure = random.choice(self.procedures)
-            return template.format(procedure=procedure)
-        elif "{condition}" in template:
-            condition = random.choice(self.conditions)
-            return template.format(condition=condition)
-        elif "{term}" in template:
-            term = random.choice(self.terms)
-            return template.format(term=term)
-        elif "{process}" in template:
-            process = random.choice(self.processes)
-            return template.format(process=process)
-        else:
+        fields = self._template_fields.get(template)
+        if not fields:
             return template
+        return template.format(**{field: self.rng.choice(self._field_sources[field]) for field in fields})
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract keywords from text"""
         # Simple keyword extraction - can be enhanced
         words = text.split()
         # Filter for Arabic words and common legal terms
-        keywords = [word for word in words if len(word) > 3 and any(ord(c) >= 0x0600 for c in word)]
+        keywords = [word for word in words if len(word) > 3 and _ARABIC_CHAR_RE.search(word)]
         return keywords[:10]  # Top 10 keywords
     
     def create_qa_pairs(self, num_pairs: int = 100) -> List[Dict[str, Any]]:
@@ -153,19 +134,20 @@ class FineTuningDatasetPreparer:
         if not self.chunks:
             self.load_chunks()
         
-        qa_pairs = []
-        
         # Ensure we have enough chunks
         if len(self.chunks) < num_pairs:
             print(f"Warning: Only {len(self.chunks)} chunks available, creating {len(self.chunks)} pairs")
             num_pairs = len(self.chunks)
         
-        # Select random chunks
-        selected_chunks = random.sample(self.chunks, num_pairs)
+        # Select random chunks, and draw every pair's template in one call
+        selected_chunks = self.rng.sample(self.chunks, num_pairs)
+        templates = self.rng.choices(self.question_templates, k=num_pairs)
+        created_at = datetime.now().isoformat()
         
-        for i, chunk in enumerate(selected_chunks):
+        # Sized up front and filled by index: no list growth while building
+        qa_pairs = [None] * num_pairs
+        for i, (chunk, template) in enumerate(zip(selected_chunks, templates)):
             # Generate question
-            template = random.choice(self.question_templates)
             question = self.generate_question(template, chunk)
             
             # Create answer with citation
@@ -184,22 +166,29 @@ class FineTuningDatasetPreparer:
                 "metadata": {
                     "template_used": template,
                     "chunk_id": chunk.get('id', ''),
-                    "created_at": datetime.now().isoformat()
+                    "created_at": created_at
                 }
             }
             
-            qa_pairs.append(qa_pair)
+            qa_pairs[i] = qa_pair
         
         return qa_pairs
     
+    def _ensure_parent_dir(self, output_file: Path):
+        """Create output_file's directory once per preparer"""
+        parent = output_file.parent
+        if parent not in self._dirs_made:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._dirs_made.add(parent)
+    
     def save_dataset(self, qa_pairs: List[Dict[str, Any]], 
                     output_path: str = "data/finetuning_dataset.json"):
         """Save dataset to file"""
         output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._ensure_parent_dir(output_file)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(qa_pairs, f, ensure_ascii=False, indent=2)
+        # Same UTF-8, 2-space layout as json.dump(ensure_ascii=False, indent=2)
+        output_file.write_bytes(orjson.dumps(qa_pairs, option=orjson.OPT_INDENT_2))
         
         print(f"Dataset saved to: {output_file}")
         print(f"Total Q&A pairs: {len(qa_pairs)}")
@@ -208,14 +197,13 @@ class FineTuningDatasetPreparer:
                         output_path: str = "data/finetuning_dataset.csv"):
         """Save dataset in CSV format for easy viewing"""
         output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._ensure_parent_dir(output_file)
         
         with open(output_file, 'w', encoding='utf-8', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(['id', 'question', 'answer_text', 'doc_id', 'article_no', 'page_start', 'page_end'])
-            
-            for pair in qa_pairs:
-                writer.writerow([
+            writer.writerows(
+                [
                     pair['id'],
                     pair['question'],
                     pair['answer']['text'],
@@ -223,7 +211,9 @@ class FineTuningDatasetPreparer:
                     pair['answer']['article_no'],
                     pair['answer']['page_start'],
                     pair['answer']['page_end']
-                ])
+                ]
+                for pair in qa_pairs
+            )
         
         print(f"CSV dataset saved to: {output_file}")
 
@@ -2,13 +2,47 @@
 """
 Test script to demonstrate RBAC functionality
 """
+import re
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:8000"
+# Case-insensitive match without building a lowercased copy of each doc_id
+_RESTRICTED_RE = re.compile(r"restricted", re.IGNORECASE)
+
+def fetch_user_responses(user):
+    """Log in as user, then fetch /me and run one search; later responses are None after a failed login"""
+    login_data = {
+        "username": user["username"],
+        "password": user["password"]
+    }
+    # requests.Session is not documented as thread-safe, so each worker keeps its own
+    with requests.Session() as session:
+        response = session.post(f"{BASE_URL}/login", json=login_data)
+        if response.status_code != 200:
+            return response, None, None
+        
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_response = session.get(f"{BASE_URL}/me", headers=headers)
+        search_data = {
+            "query": "الطاقة النووية",
+            "topk": 5
+        }
+        search_response = session.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
+        return response, user_response, search_response
+
+def login_token(session, tokens, username, password):
+    """Bearer token for username: reused from tokens, else a fresh login (None if it fails)"""
+    if username not in tokens:
+        response = session.post(f"{BASE_URL}/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            return None
+        tokens[username] = response.json()["access_token"]
+    return tokens[username]
 
 def test_rbac_system():
-    """Test the RBAC system with different user roles"""
+    """Test the RBAC system with different user roles; returns {username: access token}"""
     
     print("🔐 Testing RBAC System")
     print("=" * 50)
@@ -20,40 +54,29 @@ def test_rbac_system():
         {"username": "admin", "password": "admin123", "role": "Admin"}
     ]
     
-    for user in users:
+    # The users are independent, so their requests overlap; the report is printed in user order
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        futures = [pool.submit(fetch_user_responses, user) for user in users]
+    
+    tokens = {}
+    for user, future in zip(users, futures):
         print(f"\n👤 Testing as {user['role']} user ({user['username']})")
         print("-" * 30)
         
-        # Login
-        login_data = {
-            "username": user["username"],
-            "password": user["password"]
-        }
-        
         try:
-            response = requests.post(f"{BASE_URL}/login", json=login_data)
+            response, user_response, search_response = future.result()
             if response.status_code != 200:
                 print(f"❌ Login failed: {response.text}")
                 continue
-                
-            token_data = response.json()
-            token = token_data["access_token"]
+            tokens[user["username"]] = response.json()["access_token"]
             
-            # Get user info
-            headers = {"Authorization": f"Bearer {token}"}
-            user_response = requests.get(f"{BASE_URL}/me", headers=headers)
+            # User info
             if user_response.status_code == 200:
                 user_info = user_response.json()
                 print(f"✅ Logged in as: {user_info['full_name']}")
                 print(f"📋 Roles: {', '.join(user_info['roles'])}")
             
-            # Test search
-            search_data = {
-                "query": "الطاقة النووية",
-                "topk": 5
-            }
-            
-            search_response = requests.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
+            # Search
             if search_response.status_code == 200:
                 search_results = search_response.json()
                 print(f"🔍 Search results: {len(search_results['citations'])} accessible")
@@ -64,7 +87,7 @@ def test_rbac_system():
                 if search_results['citations']:
                     print("📄 Accessible documents:")
                     for citation in search_results['citations'][:3]:  # Show first 3
-                        restricted_marker = " [RESTRICTED]" if "restricted" in citation['doc_id'].lower() else ""
+                        restricted_marker = " [RESTRICTED]" if _RESTRICTED_RE.search(citation['doc_id']) else ""
                         print(f"  • {citation['doc_id']}{restricted_marker}")
                 else:
                     print("❌ No accessible documents found")
@@ -77,9 +100,12 @@ def test_rbac_system():
             break
         except Exception as e:
             print(f"❌ Error: {e}")
+    
+    return tokens
 
-def test_file_restrictions():
-    """Test specific file restriction functionality"""
+def test_file_restrictions(session, tokens=None):
+    """Test specific file restriction functionality, reusing tokens from test_rbac_system"""
+    tokens = {} if tokens is None else tokens
     
     print(f"\n🔒 Testing File Restrictions")
     print("=" * 50)
@@ -87,23 +113,20 @@ def test_file_restrictions():
     # Test with staff user (should not see restricted files)
     print("\n👤 Testing with Staff user (should NOT see restricted files)")
     
-    login_data = {"username": "staff", "password": "staff123"}
-    
     try:
-        response = requests.post(f"{BASE_URL}/login", json=login_data)
-        if response.status_code == 200:
-            token = response.json()["access_token"]
+        token = login_token(session, tokens, "staff", "staff123")
+        if token is not None:
             headers = {"Authorization": f"Bearer {token}"}
             
             # Search for restricted content
             search_data = {"query": "restricted", "topk": 10}
-            search_response = requests.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
+            search_response = session.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
             
             if search_response.status_code == 200:
                 results = search_response.json()
                 print(f"📊 Results: {len(results['citations'])} accessible")
                 
-                restricted_found = any("restricted" in citation['doc_id'].lower() for citation in results['citations'])
+                restricted_found = any(_RESTRICTED_RE.search(citation['doc_id']) for citation in results['citations'])
                 if restricted_found:
                     print("❌ ERROR: Staff user can see restricted documents!")
                 else:
@@ -115,23 +138,20 @@ def test_file_restrictions():
     # Test with legal user (should see restricted files)
     print("\n👤 Testing with Legal user (should see restricted files)")
     
-    login_data = {"username": "legal", "password": "legal123"}
-    
     try:
-        response = requests.post(f"{BASE_URL}/login", json=login_data)
-        if response.status_code == 200:
-            token = response.json()["access_token"]
+        token = login_token(session, tokens, "legal", "legal123")
+        if token is not None:
             headers = {"Authorization": f"Bearer {token}"}
             
             # Search for restricted content
             search_data = {"query": "restricted", "topk": 10}
-            search_response = requests.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
+            search_response = session.post(f"{BASE_URL}/ask", json=search_data, headers=headers)
             
             if search_response.status_code == 200:
                 results = search_response.json()
                 print(f"📊 Results: {len(results['citations'])} accessible")
                 
-                restricted_found = any("restricted" in citation['doc_id'].lower() for citation in results['citations'])
+                restricted_found = any(_RESTRICTED_RE.search(citation['doc_id']) for citation in results['citations'])
                 if restricted_found:
                     print("✅ CORRECT: Legal user can see restricted documents")
                 else:
@@ -145,8 +165,11 @@ if __name__ == "__main__":
     print("Make sure the server is running: uvicorn app.run_api:app --host 0.0.0.0 --port 8000 --reload")
     print()
     
-    test_rbac_system()
-    test_file_restrictions()
+    # The same users log in once; their tokens carry over to the file restriction checks
+    tokens = test_rbac_system()
+    # One keep-alive connection for the sequential checks instead of a new connection per call
+    with requests.Session() as session:
+        test_file_restrictions(session, tokens)
     
     print(f"\n🎉 RBAC Testing Complete!")
     print("=" * 50)